@@ -0,0 +1,149 @@
+"""
+Persistent content-addressed cache for generated audio.
+
+Entries are keyed by a SHA-256 of everything that affects the waveform:
+normalized text, speaker, model id, sampling parameters and sample rate.
+Each entry is one file, "<key>.pcm": an 8-byte header (magic + sample rate)
+followed by float32 little-endian samples.
+
+Writes go to a temporary file and are renamed into place, so readers and
+crashed writers never see a partial entry. The total size is capped;
+least recently used entries (by file mtime, refreshed on every hit) are
+evicted first.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+
+from fsutil import atomic_write
+
+_HEADER = struct.Struct("<4sI")
+_MAGIC = b"QTC1"
+_SUFFIX = ".pcm"
+
+
+def default_cache_dir() -> Path:
+    """Cache directory, overridable with KOKORO_TTS_CACHE_DIR."""
+    override = os.environ.get("KOKORO_TTS_CACHE_DIR")
+    if override:
+        return Path(override)
+    return Path.home() / ".cache" / "kokoro-reader" / "tts"
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different inputs share a cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text: str, **params) -> str:
+    """Hash normalized text plus generation parameters into a cache key."""
+    payload = json.dumps({"text": normalize_text(text), **params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Size-bounded LRU cache of generated audio on disk.
+
+    Args:
+        directory: Where entries are stored (created if missing)
+        max_bytes: Total size budget; oldest entries are evicted beyond it
+    """
+
+    def __init__(self, directory, max_bytes: int = 500 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        # key -> (size, last_used); rebuilt from the directory on startup
+        self._entries = {}
+        for path in self.directory.glob(f"*{_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            self._entries[path.stem] = (stat.st_size, stat.st_mtime)
+        self._total = sum(size for size, _ in self._entries.values())
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{_SUFFIX}"
+
+    def contains(self, key: str) -> bool:
+        """Whether an entry exists, without reading it or counting a hit."""
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: str):
+        """
+        Look up an entry.
+
+        Returns:
+            tuple: (audio, sample_rate) on a hit, None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                magic, sample_rate = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _MAGIC:
+                    raise ValueError("bad cache entry")
+                audio = np.frombuffer(f.read(), dtype="<f4")
+            os.utime(path)
+        except (OSError, ValueError, struct.error):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            if key in self._entries:
+                self._entries[key] = (self._entries[key][0], time.time())
+        return audio, sample_rate
+
+    def put(self, key: str, audio: np.ndarray, sample_rate: int):
+        """Store an entry atomically, then evict old entries if over budget."""
+        data = np.ascontiguousarray(audio, dtype="<f4")
+        with atomic_write(self._path(key)) as f:
+            f.write(_HEADER.pack(_MAGIC, sample_rate))
+            f.write(memoryview(data).cast("B"))
+
+        size = _HEADER.size + data.nbytes
+        with self._lock:
+            previous = self._entries.get(key)
+            self._total += size - (previous[0] if previous else 0)
+            self._entries[key] = (size, time.time())
+            self._evict()
+
+    def _evict(self):
+        """Remove least recently used entries until under max_bytes (lock held)."""
+        if self._total <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+            del self._entries[key]
+            self._total -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
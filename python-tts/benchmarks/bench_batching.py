@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Throughput vs. batch size for Qwen3TTS.synthesize_batch.
+
+Synthesizes the same set of sentences with several batch sizes and reports
+sentences/sec and audio seconds produced per wall-clock second. Loads the real
+model unless --stub is given (the sine-wave placeholder, useful to check the
+script itself on a machine without weights).
+
+Run from the repository root:
+    python python-tts/benchmarks/bench_batching.py --sizes 1 2 4 8
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from qwen3_tts_cuda import Qwen3TTS  # noqa: E402
+
+SENTENCES = [
+    "The morning light crept slowly across the valley floor.",
+    "She had not expected the letter to arrive so soon, nor to say so little.",
+    "Nobody in the village remembered who had planted the old oak tree.",
+    "He folded the map twice, tucked it into his coat, and stepped outside.",
+    "By noon the wind had changed, carrying the smell of rain from the hills.",
+    "It was, by any reasonable measure, a terrible idea.",
+    "The train was late again, and the platform was crowded with tired faces.",
+    "They walked in silence until the lights of the town came into view.",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 8], help="Batch sizes to try")
+    parser.add_argument("--sentences", type=int, default=32, help="Sentences per batch size")
+    parser.add_argument("--stub", action="store_true", help="Use the placeholder model instead of loading weights")
+    args = parser.parse_args()
+
+    tts = Qwen3TTS()
+    if not args.stub:
+        device = tts.init_model()
+        print(f"Model loaded on {device}", file=sys.stderr)
+        tts.warmup()
+
+    texts = [SENTENCES[i % len(SENTENCES)] for i in range(args.sentences)]
+
+    results = []
+    for size in args.sizes:
+        audio_seconds = 0.0
+        start = time.perf_counter()
+        for offset in range(0, len(texts), size):
+            chunk = texts[offset:offset + size]
+            for audio, sample_rate in tts.synthesize_batch(chunk, [1.0] * len(chunk)):
+                audio_seconds += audio.shape[0] / sample_rate
+        elapsed = time.perf_counter() - start
+
+        results.append({
+            "batch_size": size,
+            "elapsed_s": round(elapsed, 3),
+            "sentences_per_s": round(len(texts) / elapsed, 2),
+            "rtf": round(elapsed / audio_seconds, 4) if audio_seconds else None,
+        })
+        print(
+            f"batch {size:>2}: {results[-1]['sentences_per_s']:.2f} sentences/s  RTF {results[-1]['rtf']}",
+            file=sys.stderr,
+        )
+
+    print(json.dumps({
+        "benchmark": "batching",
+        "stub": args.stub,
+        "sentences": len(texts),
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Compile time and steady-state speedup of "compile": true in init.
+
+Launches the sidecar --launches times (default 2) against the same compile
+cache directory and reports, per launch, the init time and the sidecar's
+"compile" report: time spent compiling/warming the length buckets, eager and
+compiled RTF, and whether saved compile artifacts were loaded. The first
+launch pays the full compile; later ones should mostly load from the cache.
+An eager launch (no compile) is timed first for comparison.
+
+Needs the real model (the stub is never compiled). On GPU boxes set
+CUDA_VISIBLE_DEVICES= to measure CPU. Pass --fresh to start from an empty
+cache directory.
+
+Run from the repository root:
+    python python-tts/benchmarks/bench_compile.py --model 0.6B --fresh
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from harness import Sidecar
+
+
+def launch(args, compile_model: bool) -> dict:
+    sidecar = Sidecar()
+    sidecar.receive()
+    try:
+        start = time.perf_counter()
+        message, _ = sidecar.request(
+            "init",
+            model_size=args.model,
+            cache=False,
+            compile=compile_model,
+            compile_mode=args.mode,
+            warmup=True,
+        )
+        return {"init_s": round(time.perf_counter() - start, 3), "compile": message.get("compile")}
+    finally:
+        sidecar.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="0.6B", help="model_size to load")
+    parser.add_argument("--mode", default="default", help="torch.compile mode")
+    parser.add_argument("--launches", type=int, default=2)
+    parser.add_argument("--cache-dir", type=Path, default=None,
+                        help="Compile cache directory (default: a temporary one with --fresh, else the user cache)")
+    parser.add_argument("--fresh", action="store_true", help="Start from an empty compile cache")
+    args = parser.parse_args()
+
+    cache_dir = args.cache_dir
+    if args.fresh and cache_dir is None:
+        cache_dir = Path(tempfile.mkdtemp(prefix="kokoro-compile-"))
+    elif args.fresh and cache_dir.exists():
+        shutil.rmtree(cache_dir)
+    if cache_dir is not None:
+        # Inherited by the sidecar processes
+        os.environ["KOKORO_TTS_COMPILE_CACHE"] = str(cache_dir)
+
+    eager = launch(args, False)
+    print(json.dumps({"eager": eager}), file=sys.stderr)
+    launches = []
+    for index in range(args.launches):
+        launches.append(launch(args, True))
+        print(json.dumps({f"compiled_{index + 1}": launches[-1]}), file=sys.stderr)
+
+    print(json.dumps({
+        "benchmark": "compile",
+        "model": args.model,
+        "mode": args.mode,
+        "cache_dir": str(cache_dir) if cache_dir is not None else None,
+        "eager": eager,
+        "launches": launches,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: base64 WAV JSON lines vs. binary PCM frames.
+
+Pushes a synthetic chapter (one response per sentence) through a real OS pipe
+for each encoding, with the server-side encode on one thread and the
+client-side read + decode on another, and reports MB/s of audio delivered and
+bytes on the wire.
+
+Run from the repository root:
+    python python-tts/benchmarks/bench_framing.py --sentences 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tts_protocol import ENCODINGS, decode_audio, encode_audio, read_message, write_message  # noqa: E402
+
+
+def make_chapter(sentences: int, seconds: float, sample_rate: int):
+    """Build a list of float32 sentence waveforms (noise, so nothing compresses)."""
+    rng = np.random.default_rng(0)
+    samples = int(seconds * sample_rate)
+    return [(rng.standard_normal(samples).astype(np.float32) * 0.1) for _ in range(sentences)]
+
+
+def run(encoding: str, chapter, sample_rate: int) -> dict:
+    read_fd, write_fd = os.pipe()
+    received = {"samples": 0, "wire_bytes": 0}
+
+    def client():
+        with os.fdopen(read_fd, "rb") as stream:
+            while True:
+                message, payload = read_message(stream)
+                if message is None:
+                    break
+                audio = decode_audio(message, payload)
+                received["samples"] += audio.shape[0]
+
+    reader = threading.Thread(target=client)
+    reader.start()
+
+    start = time.perf_counter()
+    with os.fdopen(write_fd, "wb") as stream:
+        for audio in chapter:
+            fields, payload = encode_audio(audio, sample_rate, encoding)
+            message = {"status": "ok", "action": "generate", **fields}
+            write_message(stream, message, payload)
+            received["wire_bytes"] += len(json.dumps(message)) + 1
+            if payload is not None:
+                received["wire_bytes"] += 4 + payload.nbytes
+    reader.join()
+    elapsed = time.perf_counter() - start
+
+    audio_seconds = received["samples"] / sample_rate
+    return {
+        "encoding": encoding,
+        "elapsed_s": round(elapsed, 4),
+        "wire_mb": round(received["wire_bytes"] / 1e6, 2),
+        "audio_s_per_s": round(audio_seconds / elapsed, 1),
+        "wire_mb_per_s": round(received["wire_bytes"] / 1e6 / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=200, help="Responses per chapter")
+    parser.add_argument("--seconds", type=float, default=6.0, help="Audio seconds per sentence")
+    parser.add_argument("--sample-rate", type=int, default=24000)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per encoding (best is reported)")
+    args = parser.parse_args()
+
+    chapter = make_chapter(args.sentences, args.seconds, args.sample_rate)
+
+    results = []
+    for encoding in ENCODINGS:
+        runs = [run(encoding, chapter, args.sample_rate) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r["elapsed_s"])
+        results.append(best)
+        print(
+            f"{encoding:>11}: {best['elapsed_s']:.3f}s  {best['wire_mb']:.1f} MB on the wire  "
+            f"{best['audio_s_per_s']:.0f}x real time",
+            file=sys.stderr,
+        )
+
+    baseline = results[0]["elapsed_s"]
+    for result in results:
+        result["speedup_vs_base64"] = round(baseline / result["elapsed_s"], 2)
+
+    print(json.dumps({
+        "benchmark": "framing",
+        "sentences": args.sentences,
+        "seconds_per_sentence": args.seconds,
+        "sample_rate": args.sample_rate,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Round-trip savings of generate_many on a chapter-sized request.
+
+Synthesizes the same chapter (200 sentences by default) three ways and
+reports wall time, time to the first audio and per-sentence overhead:
+
+- sequential: one generate per sentence, each waiting for its response
+  (what the app does today)
+- pipelined: every generate sent up front, responses collected as they come
+- generate_many: a single command carrying all sentences
+
+With the default zero-compute stub only protocol and scheduling costs remain,
+so the differences are the round-trip savings; pass --stub-rtf or --model to
+see them against real synthesis time. The audio cache is disabled so every
+mode synthesizes everything.
+
+Run from the repository root:
+    python python-tts/benchmarks/bench_generate_many.py --sentences 200
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from harness import SENTENCES, Sidecar
+
+
+def start_sidecar(args) -> Sidecar:
+    sidecar = Sidecar()
+    sidecar.receive()
+    sidecar.request(
+        "init",
+        model_size=args.model,
+        stub_rtf=args.stub_rtf,
+        cache=False,
+        batch_window_ms=args.batch_window_ms,
+        warmup=True,
+    )
+    return sidecar
+
+
+def run_sequential(sidecar: Sidecar, chapter: list, encoding: str):
+    start = time.perf_counter()
+    first = None
+    for text in chapter:
+        sidecar.request("generate", text=text, encoding=encoding)
+        if first is None:
+            first = time.perf_counter() - start
+    return time.perf_counter() - start, first
+
+
+def run_pipelined(sidecar: Sidecar, chapter: list, encoding: str):
+    start = time.perf_counter()
+    pending = {sidecar.send("generate", text=text, encoding=encoding) for text in chapter}
+    first = None
+    while pending:
+        message, _ = sidecar.receive()
+        if message.get("id") in pending:
+            pending.discard(message["id"])
+            if first is None:
+                first = time.perf_counter() - start
+    return time.perf_counter() - start, first
+
+
+def run_generate_many(sidecar: Sidecar, chapter: list, encoding: str):
+    start = time.perf_counter()
+    request_id = sidecar.send("generate_many", texts=chapter, encoding=encoding)
+    first = None
+    received = 0
+    while True:
+        message, _ = sidecar.receive()
+        if message.get("id") != request_id:
+            continue
+        received += 1
+        if first is None:
+            first = time.perf_counter() - start
+        if message.get("final"):
+            break
+    assert received == len(chapter), f"expected {len(chapter)} results, got {received}"
+    return time.perf_counter() - start, first
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="stub", help='"stub" or a model_size such as 0.6B')
+    parser.add_argument("--stub-rtf", type=float, default=0.0, help="Simulated RTF for the stub model")
+    parser.add_argument("--sentences", type=int, default=200)
+    parser.add_argument("--batch-window-ms", type=float, default=5, help="Sidecar micro-batching window")
+    parser.add_argument("--encoding", default="pcm_s16le")
+    args = parser.parse_args()
+
+    chapter = [SENTENCES[i % len(SENTENCES)] for i in range(args.sentences)]
+
+    modes = {
+        "sequential": run_sequential,
+        "pipelined": run_pipelined,
+        "generate_many": run_generate_many,
+    }
+    results = {}
+    for name, run in modes.items():
+        sidecar = start_sidecar(args)
+        try:
+            elapsed, first = run(sidecar, chapter, args.encoding)
+        finally:
+            sidecar.close()
+        results[name] = {
+            "elapsed_s": round(elapsed, 4),
+            "first_audio_s": round(first, 4),
+            "ms_per_sentence": round(elapsed / len(chapter) * 1000, 3),
+        }
+        print(json.dumps({name: results[name]}), file=sys.stderr)
+
+    sequential = results["sequential"]["elapsed_s"]
+    for result in results.values():
+        result["saved_vs_sequential_s"] = round(sequential - result["elapsed_s"], 4)
+
+    print(json.dumps({
+        "benchmark": "generate_many",
+        "model": args.model,
+        "stub_rtf": args.stub_rtf if args.model == "stub" else None,
+        "sentences": len(chapter),
+        "batch_window_ms": args.batch_window_ms,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Throughput scaling of the sidecar's multi-process worker pool.
+
+For each worker count, starts the sidecar, initializes it with "workers": N,
+sends every sentence up front (like the app's prefetch does) and reports
+sentences/sec, RTF and speedup over a single worker. A worker count of 1 runs
+the ordinary single-process sidecar.
+
+With the default stub model, compute is simulated with sleeps and scales
+perfectly, so the numbers show the pool's scheduling and IPC overhead; pass
+--model 0.6B on a many-core CPU to measure real scaling (threads per worker
+default to an even split of the cores).
+
+Run from the repository root:
+    python python-tts/benchmarks/bench_pool.py --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from harness import SENTENCES, Sidecar, bench_pipelined
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="stub", help='"stub" or a model_size such as 0.6B')
+    parser.add_argument("--stub-rtf", type=float, default=0.2, help="Simulated RTF for the stub model")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--threads-per-worker", type=int, help="Default: cores / workers")
+    parser.add_argument("--sentences", type=int, default=64)
+    parser.add_argument("--encoding", default="pcm_s16le")
+    args = parser.parse_args()
+
+    sentences = [SENTENCES[i % len(SENTENCES)] for i in range(args.sentences)]
+
+    results = []
+    for workers in args.workers:
+        sidecar = Sidecar()
+        try:
+            sidecar.receive()
+            init, _ = sidecar.request(
+                "init",
+                model_size=args.model,
+                stub_rtf=args.stub_rtf,
+                cache=False,
+                workers=workers,
+                threads_per_worker=args.threads_per_worker,
+                warmup=True,
+            )
+            result = {
+                "workers": workers,
+                "threads_per_worker": init.get("threads_per_worker"),
+                **bench_pipelined(sidecar, sentences, args.encoding),
+            }
+        finally:
+            sidecar.close()
+
+        result["speedup"] = round(result["sentences_per_s"] / results[0]["sentences_per_s"], 2) if results else 1.0
+        results.append(result)
+        print(json.dumps(result), file=sys.stderr)
+
+    print(json.dumps({
+        "benchmark": "pool",
+        "model": args.model,
+        "stub_rtf": args.stub_rtf if args.model == "stub" else None,
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
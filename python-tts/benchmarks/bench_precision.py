@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Quality/latency comparison of CPU precision modes against fp32.
+
+Loads the model once per precision ("fp32", "int8", "bf16"), synthesizes the
+same sentences with a fixed seed, and reports real-time factor plus how close
+each mode's output is to fp32. Exact waveforms differ as soon as one sampled
+codec token changes, so similarity is measured on the long-term average
+magnitude spectrum (cosine similarity) and on duration ratio.
+
+Needs the real model and runs on CPU (set CUDA_VISIBLE_DEVICES= on GPU boxes).
+
+Run from the repository root:
+    python python-tts/benchmarks/bench_precision.py --model-size 0.6B
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import qwen3_tts_cuda  # noqa: E402
+from qwen3_tts_cuda import CPU_PRECISIONS, Qwen3TTS  # noqa: E402
+
+SENTENCES = [
+    "The morning light crept slowly across the valley floor.",
+    "She had not expected the letter to arrive so soon, nor to say so little.",
+    "He folded the map twice, tucked it into his coat, and stepped outside.",
+    "By noon the wind had changed, carrying the smell of rain from the hills.",
+]
+
+
+def average_spectrum(audio: np.ndarray, frame: int = 512) -> np.ndarray:
+    frames = audio[: audio.shape[0] // frame * frame].reshape(-1, frame)
+    return np.abs(np.fft.rfft(frames * np.hanning(frame), axis=1)).mean(axis=0)
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-12))
+
+
+def run(tts: Qwen3TTS, seed: int):
+    outputs = []
+    audio_seconds = 0.0
+    start = time.perf_counter()
+    for text in SENTENCES:
+        qwen3_tts_cuda.torch.manual_seed(seed)
+        audio, sample_rate = tts.synthesize(text)
+        outputs.append(audio)
+        audio_seconds += audio.shape[0] / sample_rate
+    elapsed = time.perf_counter() - start
+    return outputs, elapsed / audio_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-size", default="0.6B")
+    parser.add_argument("--precisions", nargs="+", default=list(CPU_PRECISIONS), choices=CPU_PRECISIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tts = Qwen3TTS()
+    reference = None
+    results = []
+
+    for precision in args.precisions:
+        # Keep one model resident at a time so memory use stays comparable
+        tts.registry.budget_bytes = 0
+        tts.init_model(args.model_size, cpu_precision=precision)
+        tts.warmup()
+        outputs, rtf = run(tts, args.seed)
+
+        result = {"requested": precision, "precision": tts.precision, "rtf": round(rtf, 3)}
+        if reference is None:
+            reference = outputs
+        else:
+            result["spectral_similarity"] = round(float(np.mean([
+                cosine(average_spectrum(a), average_spectrum(b)) for a, b in zip(outputs, reference)
+            ])), 4)
+            result["duration_ratio"] = round(
+                sum(a.shape[0] for a in outputs) / sum(b.shape[0] for b in reference), 3
+            )
+        results.append(result)
+        print(json.dumps(result), file=sys.stderr)
+
+    print(json.dumps({
+        "benchmark": "precision",
+        "model_size": args.model_size,
+        "reference": args.precisions[0],
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Gaps at sentence boundaries with and without sidecar-side prefetch.
+
+Simulates the app's reader: request a sentence, "play" it (sleep for its
+duration divided by --playback-speed), then request the next one, like
+useTTS.ts does after chunk_finished. Every millisecond spent waiting for a
+response after the first sentence is an audible gap. Runs once without
+prefetch and once after submitting the whole list with the prefetch action,
+and reports the total and worst gap.
+
+Run from the repository root:
+    python python-tts/benchmarks/bench_prefetch.py --stub-rtf 0.3
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from harness import SENTENCES, Sidecar, audio_seconds
+
+
+def read_aloud(sidecar: Sidecar, sentences: list, playback_speed: float, prefetch: bool, budget_s: float) -> dict:
+    if prefetch:
+        sidecar.request("prefetch", session="bench", texts=sentences, budget_s=budget_s)
+
+    gaps = []
+    served = 0
+    for index, text in enumerate(sentences):
+        start = time.perf_counter()
+        message, payload = sidecar.request("generate", text=text, encoding="pcm_s16le")
+        if index:
+            gaps.append(time.perf_counter() - start)
+        served += bool(message.get("prefetched"))
+        time.sleep(audio_seconds(message, payload) / playback_speed)
+
+    return {
+        "total_gap_s": round(sum(gaps), 3),
+        "max_gap_ms": round(max(gaps) * 1000, 1),
+        "mean_gap_ms": round(sum(gaps) / len(gaps) * 1000, 1),
+        "served_from_prefetch": served,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="stub", help='"stub" or a model_size such as 0.6B')
+    parser.add_argument("--stub-rtf", type=float, default=0.3, help="Simulated RTF for the stub model")
+    parser.add_argument("--sentences", type=int, default=12)
+    parser.add_argument("--playback-speed", type=float, default=2.0, help="Divides the simulated playback time")
+    parser.add_argument("--budget-s", type=float, default=30.0, help="Prefetch budget in audio seconds")
+    args = parser.parse_args()
+
+    sentences = [f"{SENTENCES[i % len(SENTENCES)]} ({i})" for i in range(args.sentences)]
+
+    results = {}
+    for mode in ("without_prefetch", "with_prefetch"):
+        sidecar = Sidecar()
+        try:
+            sidecar.receive()
+            sidecar.request("init", model_size=args.model, stub_rtf=args.stub_rtf, cache=False, warmup=True)
+            results[mode] = read_aloud(
+                sidecar, sentences, args.playback_speed, mode == "with_prefetch", args.budget_s
+            )
+        finally:
+            sidecar.close()
+        print(json.dumps({mode: results[mode]}), file=sys.stderr)
+
+    print(json.dumps({
+        "benchmark": "prefetch",
+        "model": args.model,
+        "stub_rtf": args.stub_rtf if args.model == "stub" else None,
+        "sentences": len(sentences),
+        "playback_speed": args.playback_speed,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
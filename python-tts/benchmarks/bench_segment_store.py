@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+One-file-per-entry AudioCache vs. the packed, memory-mapped SegmentStore.
+
+Stores the same number of sentence-length segments in both, then reads them
+back in random order, cold (a fresh store instance, as after a restart) and
+warm. Reports files created, bytes on disk, put and get time per segment and
+whether a hit can be framed as pcm_s16le without a copy.
+
+Run from the repository root:
+    python python-tts/benchmarks/bench_segment_store.py --segments 5000
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from audio_cache import AudioCache, cache_key  # noqa: E402
+from segment_store import SegmentStore  # noqa: E402
+from tts_protocol import to_pcm  # noqa: E402
+
+
+def measure(store_class, directory: Path, segments: list) -> dict:
+    store = store_class(directory, max_bytes=None if store_class is SegmentStore else 1 << 62)
+    start = time.perf_counter()
+    for key, audio in segments:
+        store.put(key, audio, 12000)
+    put_s = time.perf_counter() - start
+
+    keys = [key for key, _ in segments]
+    random.Random(0).shuffle(keys)
+    results = {}
+    for label in ("cold", "warm"):
+        if label == "cold":
+            store = store_class(directory, max_bytes=None if store_class is SegmentStore else 1 << 62)
+        start = time.perf_counter()
+        for key in keys:
+            audio, _ = store.get(key)
+            to_pcm(audio, "pcm_s16le")
+        results[f"get_{label}_us"] = round((time.perf_counter() - start) / len(keys) * 1e6, 2)
+
+    audio, _ = store.get(keys[0])
+    files = [path for path in directory.iterdir() if path.is_file()]
+    return {
+        "files": len(files),
+        "disk_bytes": sum(path.stat().st_size for path in files),
+        "put_us": round(put_s / len(segments) * 1e6, 2),
+        **results,
+        "zero_copy_s16": bool(np.shares_memory(audio, to_pcm(audio, "pcm_s16le"))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=2000)
+    parser.add_argument("--seconds", type=float, default=4.0, help="Audio length per segment")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    samples = int(args.seconds * 12000)
+    segments = [
+        (cache_key(f"sentence {i}"), (rng.standard_normal(samples) * 0.1).astype(np.float32))
+        for i in range(args.segments)
+    ]
+
+    report = {"benchmark": "segment_store", "segments": args.segments, "seconds_each": args.seconds}
+    for name, store_class in (("files", AudioCache), ("packed", SegmentStore)):
+        with tempfile.TemporaryDirectory() as directory:
+            report[name] = measure(store_class, Path(directory), segments)
+        print(json.dumps({name: report[name]}), file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Speed and pitch check for the WSOLA time-stretch.
+
+Stretches a synthetic voiced signal (harmonics of a 140 Hz fundamental with
+slow vibrato) at typical sentence lengths and speeds, and reports how many
+times faster than real time it runs on this CPU and the fundamental frequency
+before and after (it should not move). Exits non-zero if any case is slower
+than --min-speedup times real time.
+
+Run from the repository root:
+    python python-tts/benchmarks/bench_time_stretch.py
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from time_stretch import time_stretch  # noqa: E402
+
+F0 = 140.0
+
+
+def voiced_signal(seconds: float, sample_rate: int) -> np.ndarray:
+    t = np.arange(int(seconds * sample_rate), dtype=np.float32) / sample_rate
+    phase = 2 * np.pi * F0 * t + 0.3 * np.sin(2 * np.pi * 5 * t)
+    audio = sum(np.sin(k * phase) / k for k in range(1, 6))
+    return (0.2 * audio).astype(np.float32)
+
+
+def fundamental(audio: np.ndarray, sample_rate: int) -> float:
+    spectrum = np.abs(np.fft.rfft(audio * np.hanning(audio.shape[0])))
+    freqs = np.fft.rfftfreq(audio.shape[0], 1 / sample_rate)
+    band = (freqs > 60) & (freqs < 400)
+    return float(freqs[band][np.argmax(spectrum[band])])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sample-rates", type=int, nargs="+", default=[12000, 24000])
+    parser.add_argument("--seconds", type=float, nargs="+", default=[2.0, 5.0, 10.0], help="Sentence lengths")
+    parser.add_argument("--speeds", type=float, nargs="+", default=[0.75, 1.25, 1.5, 2.0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-speedup", type=float, default=50.0)
+    args = parser.parse_args()
+
+    results = []
+    for sample_rate in args.sample_rates:
+        for seconds in args.seconds:
+            audio = voiced_signal(seconds, sample_rate)
+            for speed in args.speeds:
+                timings = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    stretched = time_stretch(audio, speed, sample_rate)
+                    timings.append(time.perf_counter() - start)
+
+                best = min(timings)
+                results.append({
+                    "sample_rate": sample_rate,
+                    "seconds": seconds,
+                    "speed": speed,
+                    "ms": round(best * 1000, 2),
+                    "x_real_time": round(seconds / best, 1),
+                    "f0_in": round(fundamental(audio, sample_rate), 1),
+                    "f0_out": round(fundamental(stretched, sample_rate), 1),
+                })
+                r = results[-1]
+                print(
+                    f"{sample_rate:>5} Hz {seconds:>4.1f}s x{speed:<4}: {r['ms']:>7.2f} ms  "
+                    f"{r['x_real_time']:>7.1f}x real time  f0 {r['f0_in']} -> {r['f0_out']} Hz",
+                    file=sys.stderr,
+                )
+
+    slowest = min(r["x_real_time"] for r in results)
+    print(json.dumps({
+        "benchmark": "time_stretch",
+        "min_x_real_time": slowest,
+        "results": results,
+    }, indent=2))
+
+    if slowest < args.min_speedup:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
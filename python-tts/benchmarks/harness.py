@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark harness for the qwen3_tts_cuda.py sidecar.
+
+Spawns the sidecar, drives its stdin/stdout protocol exactly like the app
+does, and reports as JSON:
+
+- startup: time until "ready" and until "init" completes
+- ttfa: time to first audio for generate (whole reply) and generate_stream
+  (first chunk) on a long paragraph
+- sequential: real-time factor and sentences/sec, one request at a time
+- pipelined: sentences/sec with every request sent up front
+- protocol: per-response overhead and wire bytes per audio second for each
+  encoding, measured with the stub at zero compute so only framing remains
+- memory: peak RSS of the sidecar process
+- sidecar_stats: the sidecar's own "stats" snapshot after the run
+
+By default it uses the weight-free stub model (see stub_model.py), so it runs
+on a CPU-only machine without torch; pass --model 0.6B to measure the real
+model. Results are machine-readable so runs can be diffed.
+
+Run from the repository root:
+    python python-tts/benchmarks/harness.py --output bench.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SIDECAR_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SIDECAR_DIR))
+
+from tts_protocol import ENCODINGS, decode_audio, read_message  # noqa: E402
+
+SENTENCES = [
+    "The morning light crept slowly across the valley floor.",
+    "She had not expected the letter to arrive so soon, nor to say so little.",
+    "Nobody in the village remembered who had planted the old oak tree.",
+    "He folded the map twice, tucked it into his coat, and stepped outside.",
+    "By noon the wind had changed, carrying the smell of rain from the hills.",
+    "It was, by any reasonable measure, a terrible idea.",
+    "The train was late again, and the platform was crowded with tired faces.",
+    "They walked in silence until the lights of the town came into view.",
+]
+
+PARAGRAPH = " ".join(SENTENCES)
+
+
+class Sidecar:
+    """A running sidecar process and a blocking protocol client for it."""
+
+    def __init__(self, script: Path = SIDECAR_DIR / "qwen3_tts_cuda.py"):
+        self.started = time.perf_counter()
+        self.process = subprocess.Popen(
+            [sys.executable, str(script)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._next_id = 0
+        self.wire_bytes = 0
+
+    def send(self, action: str, **fields) -> int:
+        self._next_id += 1
+        command = {"id": self._next_id, "action": action, **fields}
+        self.process.stdin.write(json.dumps(command).encode("utf-8") + b"\n")
+        self.process.stdin.flush()
+        return self._next_id
+
+    def receive(self):
+        message, payload = read_message(self.process.stdout)
+        if message is None:
+            raise EOFError("Sidecar closed its stdout")
+        self.wire_bytes += len(json.dumps(message)) + 1
+        if payload is not None:
+            self.wire_bytes += 4 + len(payload)
+        if message.get("status") == "error":
+            raise RuntimeError(f"Sidecar error: {message.get('error')}")
+        return message, payload
+
+    def request(self, action: str, **fields):
+        """Send one command and wait for its (final) response."""
+        request_id = self.send(action, **fields)
+        while True:
+            message, payload = self.receive()
+            if message.get("id") == request_id and message.get("action") == action:
+                return message, payload
+
+    def close(self) -> int:
+        """Shut the sidecar down and return its peak RSS in bytes (0 if unknown)."""
+        try:
+            self.request("shutdown")
+        except (EOFError, BrokenPipeError, RuntimeError):
+            pass
+        self.process.stdin.close()
+        self.process.wait(timeout=30)
+        return peak_rss_of_children()
+
+
+def peak_rss_of_children() -> int:
+    """Peak RSS of any waited-for child process (Unix only)."""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def audio_seconds(message: dict, payload) -> float:
+    return decode_audio(message, payload).shape[0] / message["sample_rate"]
+
+
+def bench_startup(model: str, stub_rtf: float):
+    sidecar = Sidecar()
+    message, _ = sidecar.receive()
+    assert message["action"] == "ready"
+    ready_s = time.perf_counter() - sidecar.started
+
+    start = time.perf_counter()
+    sidecar.request("init", model_size=model, stub_rtf=stub_rtf, cache=False)
+    init_s = time.perf_counter() - start
+    return sidecar, {"ready_s": round(ready_s, 3), "init_s": round(init_s, 3)}
+
+
+def bench_ttfa(sidecar: Sidecar, encoding: str) -> dict:
+    start = time.perf_counter()
+    sidecar.request("generate", text=PARAGRAPH, encoding=encoding)
+    whole = time.perf_counter() - start
+
+    request_id = sidecar.send("generate_stream", text=PARAGRAPH, encoding=encoding)
+    start = time.perf_counter()
+    first = None
+    while True:
+        message, _ = sidecar.receive()
+        if message.get("id") != request_id:
+            continue
+        if first is None:
+            first = time.perf_counter() - start
+        if message.get("final"):
+            break
+
+    return {
+        "paragraph_chars": len(PARAGRAPH),
+        "generate_s": round(whole, 4),
+        "generate_stream_first_chunk_s": round(first, 4),
+    }
+
+
+def bench_sequential(sidecar: Sidecar, sentences: list, encoding: str) -> dict:
+    produced = 0.0
+    start = time.perf_counter()
+    for text in sentences:
+        message, payload = sidecar.request("generate", text=text, encoding=encoding)
+        produced += audio_seconds(message, payload)
+    elapsed = time.perf_counter() - start
+    return {
+        "sentences": len(sentences),
+        "elapsed_s": round(elapsed, 4),
+        "sentences_per_s": round(len(sentences) / elapsed, 2),
+        "rtf": round(elapsed / produced, 4),
+    }
+
+
+def bench_pipelined(sidecar: Sidecar, sentences: list, encoding: str) -> dict:
+    start = time.perf_counter()
+    pending = {sidecar.send("generate", text=text, encoding=encoding) for text in sentences}
+    produced = 0.0
+    while pending:
+        message, payload = sidecar.receive()
+        if message.get("id") in pending and message.get("action") == "generate":
+            pending.discard(message["id"])
+            produced += audio_seconds(message, payload)
+    elapsed = time.perf_counter() - start
+    return {
+        "sentences": len(sentences),
+        "elapsed_s": round(elapsed, 4),
+        "sentences_per_s": round(len(sentences) / elapsed, 2),
+        "rtf": round(elapsed / produced, 4),
+    }
+
+
+def bench_protocol(sentences: list) -> dict:
+    """Overhead per encoding with a zero-compute stub, so only framing is timed."""
+    sidecar = Sidecar()
+    sidecar.receive()
+    # No batching window either: it would dominate a zero-compute request
+    sidecar.request("init", model_size="stub", stub_rtf=0.0, cache=False, batch_window_ms=0)
+
+    results = {}
+    for encoding in ENCODINGS:
+        sidecar.wire_bytes = 0
+        produced = 0.0
+        start = time.perf_counter()
+        for text in sentences:
+            message, payload = sidecar.request("generate", text=text, encoding=encoding)
+            produced += audio_seconds(message, payload)
+        elapsed = time.perf_counter() - start
+        results[encoding] = {
+            "ms_per_response": round(elapsed / len(sentences) * 1000, 3),
+            "wire_bytes_per_audio_s": int(sidecar.wire_bytes / produced),
+        }
+
+    sidecar.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="stub", help='"stub" or a model_size such as 0.6B')
+    parser.add_argument("--stub-rtf", type=float, default=0.1, help="Simulated RTF for the stub model")
+    parser.add_argument("--sentences", type=int, default=40)
+    parser.add_argument("--encoding", default="pcm_s16le", choices=ENCODINGS)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    sentences = [SENTENCES[i % len(SENTENCES)] for i in range(args.sentences)]
+
+    sidecar, startup = bench_startup(args.model, args.stub_rtf)
+    try:
+        report = {
+            "benchmark": "sidecar",
+            "model": args.model,
+            "stub_rtf": args.stub_rtf if args.model == "stub" else None,
+            "encoding": args.encoding,
+            "platform": sys.platform,
+            "cpu_count": os.cpu_count(),
+            "startup": startup,
+            "ttfa": bench_ttfa(sidecar, args.encoding),
+            "sequential": bench_sequential(sidecar, sentences, args.encoding),
+            "pipelined": bench_pipelined(sidecar, sentences, args.encoding),
+        }
+        report["sidecar_stats"], _ = sidecar.request("stats")
+    finally:
+        peak_rss = sidecar.close()
+
+    report["memory"] = {"peak_rss_mb": round(peak_rss / (1024 * 1024), 1)}
+    report["protocol"] = bench_protocol(sentences)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
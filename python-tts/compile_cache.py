@@ -0,0 +1,98 @@
+"""
+torch.compile support for the TTS sidecar.
+
+Compile mode ({"action": "init", "compile": true}) compiles the model's
+transformer stacks (every outermost submodule with a "layers" list, i.e. the
+part that runs once per decode step) with symbolic shapes, so a growing
+sequence or a different batch size does not trigger a recompile. The text
+lengths the sidecar sees are covered by warming a few length buckets (see
+Qwen3TTS.warmup), and torch._dynamo's cache_size_limit bounds how many graphs
+a module may collect before it falls back to eager.
+
+Compiled kernels persist in an on-disk cache so a second launch does not pay
+the compile cost again: Inductor's FX graph and autograd caches are pointed
+at the cache directory, and where torch supports it (2.7+) the whole set of
+compile artifacts is also saved after warmup and loaded before the first
+compile, keyed by the same machine signature as the thread profile.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+from fsutil import atomic_write
+
+# Graphs a compiled module may collect before torch._dynamo falls back to eager
+RECOMPILE_LIMIT = 8
+
+COMPILE_MODES = ("default", "reduce-overhead", "max-autotune")
+
+
+def default_compile_dir() -> Path:
+    """Compile cache location, overridable with KOKORO_TTS_COMPILE_CACHE."""
+    override = os.environ.get("KOKORO_TTS_COMPILE_CACHE")
+    if override:
+        return Path(override)
+    return Path.home() / ".cache" / "kokoro-reader" / "torch_compile"
+
+
+def configure(torch, directory: Path):
+    """Point Inductor's persistent caches at directory and bound recompiles."""
+    directory.mkdir(parents=True, exist_ok=True)
+    # Read by Inductor whenever it looks up its cache directory
+    os.environ["TORCHINDUCTOR_CACHE_DIR"] = str(directory / "inductor")
+    os.environ.setdefault("TORCHINDUCTOR_FX_GRAPH_CACHE", "1")
+    os.environ.setdefault("TORCHINDUCTOR_AUTOGRAD_CACHE", "1")
+
+    import torch._dynamo
+    import torch._inductor.config as inductor_config
+
+    torch._dynamo.config.cache_size_limit = RECOMPILE_LIMIT
+    for option in ("fx_graph_cache", "autograd_cache"):
+        if hasattr(inductor_config, option):
+            setattr(inductor_config, option, True)
+
+
+def decoder_modules(torch, module) -> list:
+    """Outermost submodules holding a transformer layer stack."""
+    found = []
+
+    def visit(child):
+        if isinstance(getattr(child, "layers", None), torch.nn.ModuleList):
+            found.append(child)
+            return
+        for grandchild in child.children():
+            visit(grandchild)
+
+    visit(module)
+    return found
+
+
+def artifacts_path(directory: Path, signature: str) -> Path:
+    digest = hashlib.sha256(signature.encode("utf-8")).hexdigest()[:16]
+    return directory / f"artifacts-{digest}.bin"
+
+
+def load_artifacts(torch, path: Path) -> bool:
+    """Preload saved compile artifacts (torch 2.7+); False if there are none."""
+    load = getattr(getattr(torch, "compiler", None), "load_cache_artifacts", None)
+    if load is None or not path.exists():
+        return False
+    try:
+        return load(path.read_bytes()) is not None
+    except Exception:
+        return False
+
+
+def save_artifacts(torch, path: Path) -> bool:
+    """Save everything compiled so far (torch 2.7+); False if unsupported."""
+    save = getattr(getattr(torch, "compiler", None), "save_cache_artifacts", None)
+    if save is None:
+        return False
+    result = save()
+    if result is None:
+        return False
+    # Pool workers may save at the same time; each writes its own temp file
+    with atomic_write(path) as f:
+        f.write(result[0])
+    return True
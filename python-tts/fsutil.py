@@ -0,0 +1,32 @@
+"""
+Filesystem helpers shared by the sidecar, its caches and the renderer.
+
+Only depends on the standard library.
+"""
+
+import contextlib
+import os
+import tempfile
+from pathlib import Path
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode: str = "wb", suffix: str = ".tmp", **open_kwargs):
+    """
+    Write a file so readers only ever see the old or the complete new version.
+
+    Yields a file object for a temporary file in the same directory, which
+    replaces path once the block completes. If the block raises, the
+    temporary file is removed and path is left untouched. Concurrent writers
+    each get their own temporary file; the last rename wins.
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=suffix)
+    try:
+        with os.fdopen(fd, mode, **open_kwargs) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
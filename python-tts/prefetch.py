@@ -0,0 +1,202 @@
+"""
+Lookahead prefetch for the TTS sidecar.
+
+The client submits the upcoming sentences of a reading session once
+({"action": "prefetch", "session": ..., "texts": [...]}) and then keeps
+sending ordinary generate commands. While the worker thread has nothing else
+to do, it synthesizes the session's sentences ahead of the reader into an
+in-memory ready buffer, up to an audio-seconds budget; a generate whose text
+is in the buffer is answered from it without touching the model.
+
+Sentences are identified by their cache key (text plus generation
+parameters), so a generate matches a prefetched sentence exactly when it
+would have produced the same audio. Serving (or synthesizing in the
+foreground) a session's sentence moves the session's read position past it;
+buffered sentences behind the position are dropped.
+
+Foreground work always wins: the server pre-empts a running prefetch
+synthesis as soon as another command is queued (see TTSServer.dispatch), and
+the sentence is simply attempted again later.
+"""
+
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+
+class PrefetchJob:
+    """One sentence to synthesize ahead of the reader."""
+
+    __slots__ = ("session", "index", "key", "text", "speed", "temperature", "speaker")
+
+    def __init__(self, session, index, key, text, speed, temperature, speaker=None):
+        self.session = session
+        self.index = index
+        self.key = key
+        self.text = text
+        self.speed = speed
+        self.temperature = temperature
+        self.speaker = speaker
+
+
+class PrefetchSession:
+    """
+    Args:
+        items: Ordered (cache key, text) pairs
+        budget_s: Maximum audio seconds held in the ready buffer
+        speaker: Speaker for every sentence (None for the default)
+    """
+
+    def __init__(self, session_id, items: list, speed: float, temperature: float, budget_s: float,
+                 speaker: str = None):
+        self.session_id = session_id
+        self.items = items
+        self.speed = speed
+        self.temperature = temperature
+        self.budget_s = budget_s
+        self.speaker = speaker
+        self.position = 0
+        # key -> every index it appears at, ascending (a book repeats short sentences)
+        self.positions = {}
+        for index, (key, _) in enumerate(items):
+            self.positions.setdefault(key, []).append(index)
+        # key -> (audio, sample_rate, index), in synthesis order
+        self.ready = OrderedDict()
+        self.buffered_s = 0.0
+        self.failed = set()
+
+    def next_job(self):
+        """The first unbuffered sentence at or after the read position, if the budget allows."""
+        if self.buffered_s >= self.budget_s:
+            return None
+        for index in range(self.position, len(self.items)):
+            key, text = self.items[index]
+            if key not in self.ready and index not in self.failed:
+                return PrefetchJob(
+                    self.session_id, index, key, text, self.speed, self.temperature, self.speaker
+                )
+        return None
+
+    def add(self, job: PrefetchJob, audio, sample_rate: int):
+        if job.index < self.position or job.key in self.ready:
+            return
+        self.ready[job.key] = (audio, sample_rate, job.index)
+        self.buffered_s += audio.shape[0] / sample_rate
+
+    def _next_index(self, key, position: int):
+        """The first index of `key` at or after position, or None."""
+        indices = self.positions.get(key, ())
+        at = bisect_left(indices, position)
+        return indices[at] if at < len(indices) else None
+
+    def take(self, key):
+        """
+        Move the read position past the next occurrence of `key` and return its buffered audio.
+
+        Returns:
+            tuple: (audio, sample_rate), or None if it was not buffered
+        """
+        index = self._next_index(key, self.position)
+        if index is None:
+            return None
+        self.position = index + 1
+
+        found = self.ready.pop(key, None)
+        if found is not None:
+            self.buffered_s -= found[0].shape[0] / found[1]
+        # Whatever the reader skipped past will not be asked for again, unless it comes up later
+        for stale in [k for k, (_, _, i) in self.ready.items() if i < self.position]:
+            audio, sample_rate, _ = self.ready[stale]
+            later = self._next_index(stale, self.position)
+            if later is not None:
+                self.ready[stale] = (audio, sample_rate, later)
+            else:
+                del self.ready[stale]
+                self.buffered_s -= audio.shape[0] / sample_rate
+        return found[:2] if found is not None else None
+
+    def depth(self) -> dict:
+        return {
+            "position": self.position,
+            "sentences": len(self.items),
+            "buffered": len(self.ready),
+            "buffered_s": round(self.buffered_s, 2),
+            "budget_s": self.budget_s,
+        }
+
+
+class Prefetcher:
+    """
+    Prefetch sessions shared by the reader and worker threads.
+
+    Sessions are served most recently submitted first.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self.served = 0
+        self.synthesized = 0
+        self.preempted = 0
+
+    def submit(self, session_id, items: list, speed: float, temperature: float, budget_s: float,
+               speaker: str = None):
+        """Start or replace a session; an empty list stops it."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            if items:
+                self._sessions[session_id] = PrefetchSession(
+                    session_id, items, speed, temperature, budget_s, speaker
+                )
+
+    def stop(self, session_id) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def next_job(self):
+        with self._lock:
+            for session in reversed(self._sessions.values()):
+                job = session.next_job()
+                if job is not None:
+                    return job
+            return None
+
+    def complete(self, job: PrefetchJob, audio, sample_rate: int, synthesized: bool = True):
+        with self._lock:
+            session = self._sessions.get(job.session)
+            if session is not None:
+                session.add(job, audio, sample_rate)
+            if synthesized:
+                self.synthesized += 1
+
+    def record_preempted(self):
+        with self._lock:
+            self.preempted += 1
+
+    def fail(self, job: PrefetchJob):
+        """Give up on a sentence that raised, so it is not retried forever."""
+        with self._lock:
+            session = self._sessions.get(job.session)
+            if session is not None:
+                session.failed.add(job.index)
+
+    def take(self, key):
+        """Buffered audio for key from any session (advancing its position), or None."""
+        with self._lock:
+            found = None
+            for session in self._sessions.values():
+                audio = session.take(key)
+                if audio is not None and found is None:
+                    found = audio
+            if found is not None:
+                self.served += 1
+            return found
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "served": self.served,
+                "synthesized": self.synthesized,
+                "preempted": self.preempted,
+                "sessions": {str(sid): session.depth() for sid, session in self._sessions.items()},
+            }
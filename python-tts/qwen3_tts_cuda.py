@@ -4,14 +4,133 @@ Qwen3-TTS server for Windows/Linux with CUDA support.
 Communicates with Tauri via JSON over stdin/stdout.
 
 Protocol:
-- Startup: Print {"status": "ok", "action": "ready"} when ready
+- Startup: Print {"status": "ok", "action": "ready"} when ready. This happens
+  before torch is imported; the import is part of "init".
 - Commands via stdin (JSON lines):
-  - {"action": "init"}
-  - {"action": "generate", "text": "...", "speed": 1.0, "temperature": 0.1}
+  - {"action": "init", "model_size": "0.6B" | "1.7B" | "stub", "memory_budget_mb": ...,
+     "cpu_precision": "fp32" | "int8" | "bf16",
+     "max_batch_size": 8, "batch_window_ms": 5, "max_batch_chars": 1200,
+     "cache": true, "cache_dir": "...", "cache_max_mb": 500, "cache_format": "packed" | "files",
+     "progress": false, "warmup": false, "autotune_threads": false, "prefetch_budget_s": 30,
+     "workers": 1, "threads_per_worker": ..., "speaker": "Ryan", "speakers": ["Vivian", ...],
+     "compile": false, "compile_mode": "default",
+     "warmup_buckets": [...]}
+    (all fields are optional). With "progress": true, {"action": "init_progress",
+    "stage": "imports" | "weights_loaded" | "on_device" | "threads_tuned" | "compiled" | "warmed",
+    "elapsed_s": ...}
+    events precede the final "init" response; "warmup": true warms the model
+    as part of init (reported in the response's "warmup", see the "warmup"
+    action). Loaded variants stay resident (LRU, within the memory budget), so
+    switching model_size back and forth does not reload weights; the response
+    lists each loaded model's load time and resident size.
+    On CPU, "cpu_precision" selects dynamic int8 quantization of the linear
+    layers or bf16 autocast (if the CPU supports it); the response reports the
+    "precision" actually in use. "model_size": "stub" loads a weight-free
+    stand-in (see stub_model.py; "stub_rtf" simulates compute time).
+    "workers": N > 1 starts pool mode (see worker_pool.py): N processes each
+    load the model with threads_per_worker threads (default: an even split of
+    the cores) and share each micro-batch; responses stay in request order.
+    In pool mode no init_progress events are sent.
+    On CPU, "autotune_threads": true picks the torch thread count with the
+    best RTF on a fixed utterance (this also warms the model) and stores it in
+    a per-machine profile (see thread_profile.py); later launches reuse the
+    stored choice. The response's "threads" reports the configuration in use
+    and where it came from ("default", "profile" or "autotuned").
+    "speaker" sets the default speaker; "speakers" are checked against the
+    model's speakers during init, so a misspelled voice fails there rather
+    than on first use. Names match case-insensitively. The response's
+    "speakers" lists the default and the model's available speakers.
+    "compile": true compiles the decoder with torch.compile and warms a few
+    text-length buckets (see compile_cache.py); compiled kernels are cached on
+    disk, so later launches mostly skip compiling. The response's "compile"
+    reports compile_s, eager and compiled RTF and the speedup (null when not
+    compiled; the stub is never compiled).
+  - {"action": "generate", "text": "...", "speed": 1.0, "temperature": 0.1, "speaker": "...",
+     "encoding": "wav_base64" | "pcm_s16le" | "pcm_f32le", "timings": false}
+    "speaker" overrides the default speaker for this command (also accepted
+    by generate_many, generate_stream and prefetch); a micro-batch may mix
+    speakers.
+    With "timings": true the response has a "timings" object: milliseconds
+    spent per stage (json_decode, cache_lookup, speaker_lookup, generate, to_numpy, speed,
+    to_float32, int16/float32, wav_pack, base64), plus prev_stdout_write, the
+    duration of the previous response's write (a response cannot time its own).
+  - {"action": "generate_many", "texts": ["...", ...], "speed": 1.0, "temperature": 0.1,
+     "encoding": "...", "timings": false}
+    -> one {"action": "generate_many", "index": i, "final": bool, ...} message
+       per text as soon as it is ready, the last one with "final": true.
+       Texts are synthesized in micro-batches (same budgets as generate), so
+       a whole chapter costs one round trip. Cached texts may be answered
+       ahead of uncached ones from the same batch; use "index" to place them.
+       A text that fails gets {"status": "error", "index": i, "final": bool}
+       and still counts towards "final".
+  - {"action": "generate_stream", "text": "...", "speed": 1.0, "encoding": "..."}
+    -> one {"action": "generate_stream", "seq": n, "final": bool, ...} message
+       per audio chunk, in order, the last one with "final": true. The text
+       is chunked by the same plan as "segment" (default first_latency_ms
+       and max_chars), and each chunk's timing feeds its latency fit.
+  - {"action": "prefetch", "session": "...", "texts": ["...", ...], "speed": 1.0,
+     "temperature": 0.1, "budget_s": 30}
+    -> {"action": "prefetch", "sentences": n}. Starts (or replaces) a lookahead
+       session (see prefetch.py): whenever no other command is waiting, the
+       sidecar synthesizes the session's upcoming sentences into a ready
+       buffer of at most budget_s audio seconds. A later generate for one of
+       them is answered from the buffer ("prefetched": true). Any queued
+       command pre-empts a running prefetch synthesis. An empty list, or a
+       cancel for the session, stops it.
+  - {"action": "cancel", "target_id": ...} or {"action": "cancel", "session": "..."}
+    -> stops the matching running generation at its next decode step and
+       drops matching queued commands; each of those gets a
+       {"status": "cancelled"} response. Commands may carry a "session".
+       "estimated_saved_s" is the generation time saved, predicted by the
+       segmenter's latency fit.
+  - {"action": "segment", "text": "...", "first_latency_ms": 500, "max_chars": 300, "speed": 1.0}
+    -> {"action": "segment", "chunks": ["...", ...], "predicted": [...], "first_audio_ms": ..., "model": {...}}
+       Splits text into chunks for streamed playback, at sentence and clause
+       boundaries only (see segmenter.py): the first chunk is sized to be
+       ready within first_latency_ms, later ones as large as possible (up to
+       max_chars) while still being ready before the audio before them has
+       played. Sizes come from latency per character learned online from the
+       sidecar's own generate timings (priors until the first generate);
+       "predicted" has each chunk's expected latency, audio length and stall,
+       "model" the current fit. Answered immediately, like "ping".
   - {"action": "ping"}
-  - {"action": "warmup"}
+  - {"action": "stats"}
+    -> cumulative metrics since startup: requests and errors by action,
+       cancellations, characters and audio seconds produced, generate latency
+       and RTF histograms with percentiles, cache hits/misses, the segmenter's
+       latency fit, peak RSS and (on CUDA) torch allocator figures, and the
+       prefetch buffer depth of each session. Answered immediately, like "ping".
+  - {"action": "warmup", "force": false}
+    -> {"action": "warmup", "warmup": {...}}. By default synthesizes one
+       short text. If init gave "warmup_buckets" (text lengths in characters),
+       it synthesizes one text per bucket instead: the first time on a machine
+       each bucket runs cold and warm and the latency curve is saved (see
+       warmup_profile.py); later launches only warm the buckets whose cold run
+       was slower, or nothing. "force" profiles again. A compiled model warms
+       every bucket (WARMUP_BUCKETS unless given) once. The report has
+       "source" ("default", "profiled", "profile" or "compiled"), the warmed
+       "buckets", "elapsed_s" and, when profiled, the "curve".
   - {"action": "shutdown"}
-- Responses via stdout (JSON lines)
+- Responses via stdout (JSON lines). At startup the protocol takes a private
+  duplicate of the stdout file descriptor and fd 1 is pointed at stderr, so
+  library output (Python or native) always goes to stderr.
+- Any command may carry a client-chosen "id"; it is echoed in every response
+  to that command (including errors and each generate_stream chunk).
+- Commands are read on the main thread and executed in order by a worker
+  thread, so the client can pipeline requests without waiting for replies.
+  "ping" is answered immediately, even while a generation or model load is
+  running; it reports the current "loading" stage while init is in progress.
+- Queued "generate" commands are micro-batched: the worker collects those that
+  arrive within a short window (up to a size and character budget) and runs
+  them as one model call. Each still gets its own response.
+- Generated audio is cached on disk; generate responses carry
+  "cache": "hit" | "miss", and hits skip the model entirely. The default
+  "packed" format keeps all entries in one memory-mapped file and sends hits
+  without copying them (see segment_store.py); "files" stores one file per
+  entry (see audio_cache.py).
+- Audio is a base64 WAV inside the JSON line by default. The "ready" message
+  lists the supported "encodings"; with a pcm_* encoding the JSON line is a
+  header followed by a length-prefixed raw PCM frame (see tts_protocol.py).
 """
 
 import sys
@@ -32,10 +151,15 @@ if sys.platform == "win32":
             os.environ["PATH"] = str(sox_path) + os.pathsep + os.environ.get("PATH", "")
             break
 
+import contextlib
+import gc
 import json
-import io
-import base64
+import queue
+import re
+import threading
+import time
 import warnings
+from collections import OrderedDict
 
 # Suppress ALL warnings and redirect library outputs to stderr
 warnings.filterwarnings("ignore")
@@ -45,23 +169,11 @@ os.environ["TRANSFORMERS_VERBOSITY"] = "error"
 os.environ["CUDA_LAUNCH_BLOCKING"] = "1"  # Better error messages
 os.environ["TORCH_USE_CUDA_DSA"] = "1"  # Enable device-side assertions
 
-# Redirect stdout temporarily to capture any library initialization output
-_original_stdout = sys.stdout
-_stderr_backup = sys.stderr
-
-# Try to import required libraries
+# Only numpy is imported at startup; torch takes seconds to import and is
+# loaded by import_torch() during "init", after "ready" has been sent
 try:
-    # Temporarily redirect stdout to stderr during imports to prevent pollution
-    sys.stdout = sys.stderr
-
-    import torch
-    import torchaudio
     import numpy as np
-
-    # Restore stdout
-    sys.stdout = _original_stdout
 except ImportError as e:
-    sys.stdout = _original_stdout
     print(json.dumps({
         "status": "error",
         "action": "startup",
@@ -69,78 +181,696 @@ except ImportError as e:
     }), flush=True)
     sys.exit(1)
 
+torch = None
+
+
+def import_torch():
+    """Import torch and torchaudio on first use."""
+    global torch
+    if torch is not None:
+        return
+
+    try:
+        import torch as _torch
+        import torchaudio  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError(
+            f"Missing required library: {e}. Please install: pip install torch torchaudio numpy"
+        )
+
+    torch = _torch
+
+from audio_cache import AudioCache, cache_key, default_cache_dir
+from compile_cache import (
+    COMPILE_MODES, artifacts_path, configure as configure_compile, decoder_modules, default_compile_dir,
+    load_artifacts, save_artifacts
+)
+from prefetch import Prefetcher
+from segment_store import SegmentStore
+from segmenter import Segmenter
+from sidecar_stats import SidecarStats, peak_rss_bytes, torch_allocator_stats
+from stub_model import STUB_MODEL_ID, StubModel
+from thread_profile import candidate_thread_counts, load_profile, machine_signature, save_profile
+from time_stretch import TimeStretcher, time_stretch
+from tts_protocol import (
+    ENCODINGS, ENCODING_WAV_BASE64, NO_TIMINGS, Timings, check_encoding, encode_audio, to_float32, to_wav_bytes,
+    write_message
+)
+from warmup_profile import load_warmup_profile, save_warmup_profile, warmup_signature
+from worker_pool import WorkerPool
+
+def split_for_streaming(text: str, segmenter: Segmenter = None, speed: float = 1.0) -> list:
+    """
+    Split text into pieces for incremental synthesis.
+
+    Uses segmenter's plan (a fresh Segmenter, i.e. the priors, if none is
+    given): the first piece is sized to be ready quickly and later ones to be
+    ready before the audio before them has played. Splits only happen at
+    clause or sentence boundaries, so a single long clause stays whole.
+    """
+    return (segmenter or Segmenter()).plan(text, speed=speed)["chunks"]
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a generation once it has been cancelled."""
+
+
+# Model variants selectable with "model_size" in init
+MODEL_VARIANTS = {
+    "0.6B": "Qwen/Qwen3-TTS-12Hz-0.6B-CustomVoice",
+    "1.7B": "Qwen/Qwen3-TTS-12Hz-1.7B-CustomVoice",
+}
+# Using 0.6B variant by default for faster generation (smaller model)
+DEFAULT_MODEL_SIZE = "0.6B"
+
+
+def resolve_model_id(model_size: str = None) -> str:
+    """Map a "model_size" value (variant key or full model id) to a model id."""
+    if not model_size:
+        return MODEL_VARIANTS[DEFAULT_MODEL_SIZE]
+    if model_size == STUB_MODEL_ID:
+        return STUB_MODEL_ID
+    for key, model_id in MODEL_VARIANTS.items():
+        if model_size.lower() in (key.lower(), model_id.lower()):
+            return model_id
+    if "/" in model_size:
+        return model_size
+    raise ValueError(f"Unknown model_size: {model_size}. Available: {', '.join(MODEL_VARIANTS)}")
+
+
+# CPU precision modes selectable with "cpu_precision" in init
+CPU_PRECISIONS = ("fp32", "int8", "bf16")
+
+# Speaker used when neither init nor the command names one
+DEFAULT_SPEAKER = "Ryan"
+
+
+def canonical_speaker(speaker: str, supported) -> str:
+    """Match speaker case-insensitively against supported (None accepts any name)."""
+    if supported is None:
+        return speaker
+    canonical = {known.lower(): known for known in supported}
+    name = canonical.get(str(speaker).lower())
+    if name is None:
+        raise ValueError(f"Unknown speaker: {speaker}. Available: {', '.join(supported)}")
+    return name
+
+# Fixed utterance timed by thread autotuning
+AUTOTUNE_TEXT = "The quick brown fox jumps over the lazy dog, then rests in the shade."
+
+# Default text lengths (characters) warmed, from short lines to long sentences
+WARMUP_BUCKETS = (20, 80, 160, 300)
+
+
+def warmup_text(chars: int) -> str:
+    """A text of about `chars` characters, made of whole words."""
+    words = AUTOTUNE_TEXT.split()
+    text = ""
+    index = 0
+    while len(text) < chars:
+        text = f"{text} {words[index % len(words)]}".lstrip()
+        index += 1
+    return text
+
+
+def cpu_supports_bf16() -> bool:
+    """Whether this CPU has native bf16 support (AVX512-BF16 or AMX)."""
+    checks = ("_is_avx512_bf16_supported", "_is_amx_tile_supported")
+    cpu = getattr(torch, "cpu", None)
+    return any(getattr(cpu, check, lambda: False)() for check in checks)
+
+
+def default_memory_budget() -> int:
+    """80% of GPU memory on CUDA, otherwise half of physical RAM (None if unknown)."""
+    if torch is not None and torch.cuda.is_available():
+        return int(torch.cuda.get_device_properties(0).total_memory * 0.8)
+    try:
+        return int(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") * 0.5)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+# Resident bytes per parameter by precision (int8 only packs the linear layers)
+BYTES_PER_PARAM = {"fp32": 4, "bf16": 4, "int8": 1.5}
+
+
+def estimate_model_bytes(model_id: str, precision: str) -> int:
+    """Rough resident size of a variant before it is loaded, from the parameter count in its id."""
+    match = re.search(r"(\d+(?:\.\d+)?)B\b", model_id)
+    if match is None:
+        return 0
+    return int(float(match.group(1)) * 1e9 * BYTES_PER_PARAM.get(precision, 4))
+
+
+def resident_bytes(model) -> int:
+    """Memory held by a model's weights (state dict, so packed int8 weights count too)."""
+    module = getattr(model, "model", model)
+    if torch is None or not isinstance(module, torch.nn.Module):
+        return 0
+
+    def size(value):
+        if torch.is_tensor(value):
+            return value.numel() * value.element_size()
+        if isinstance(value, (tuple, list)):
+            return sum(size(item) for item in value)
+        return 0
+
+    return sum(size(value) for value in module.state_dict().values())
+
+
+class ModelRegistry:
+    """
+    Loaded models, most recently used last.
+
+    Keeps every variant that fits in budget_bytes so switching between them
+    does not reload weights; the least recently used ones are dropped when a
+    new load would exceed the budget. Eviction happens before loading, using
+    an estimate of the new variant's size, so old and new weights are never
+    resident together beyond the budget; after loading, the measured size is
+    checked again. The entry being returned is never evicted.
+
+    A model's compile report is stored with its entry, so a variant that is
+    evicted and loaded again starts out eager, like its fresh weights.
+    """
+
+    def __init__(self, budget_bytes: int = None):
+        self.budget_bytes = budget_bytes
+        # key -> {"model", "info", "load_s", "resident_bytes", "compile"}
+        self._models = OrderedDict()
+
+    def __contains__(self, key) -> bool:
+        return key in self._models
+
+    def loaded(self, key):
+        """The model for key if it is still loaded, else None (never loads)."""
+        entry = self._models.get(key)
+        return entry["model"] if entry is not None else None
+
+    def get(self, key, loader, estimate_bytes: int = 0, **info):
+        """
+        Return the model for key, loading it with loader() if needed.
+
+        estimate_bytes is the expected resident size of a model that has to
+        be loaded; room for it is made first. Extra keyword arguments are
+        stored with the entry and reported by describe().
+        """
+        if key in self._models:
+            self._models.move_to_end(key)
+            return self._models[key]["model"]
+
+        self._evict(keep=None, incoming=estimate_bytes)
+        started = time.perf_counter()
+        model = loader()
+        entry = {
+            "model": model,
+            "info": info,
+            "load_s": round(time.perf_counter() - started, 3),
+            "resident_bytes": resident_bytes(model),
+            "compile": None,
+        }
+        self._models[key] = entry
+        self._evict(keep=key)
+        return model
+
+    def compile_report(self, key):
+        """Compile report of the loaded model for key, or None if it runs eagerly (or is not loaded)."""
+        entry = self._models.get(key)
+        return entry["compile"] if entry is not None else None
+
+    def set_compile_report(self, key, report: dict):
+        self._models[key]["compile"] = report
+
+    def _evict(self, keep, incoming: int = 0):
+        """Drop least recently used entries (except keep) until they and `incoming` bytes fit."""
+        if self.budget_bytes is None:
+            return
+        total = incoming + sum(entry["resident_bytes"] for entry in self._models.values())
+        evicted = False
+        for key in list(self._models):
+            if total <= self.budget_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self._models.pop(key)["resident_bytes"]
+            evicted = True
+            print(f"Unloaded model {key} to stay within memory budget", file=sys.stderr, flush=True)
+
+        if evicted:
+            gc.collect()
+            if torch is not None and torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    def describe(self) -> list:
+        """Per-model load time and resident size, least recently used first."""
+        return [
+            {
+                **entry["info"],
+                "load_s": entry["load_s"],
+                "resident_mb": round(entry["resident_bytes"] / (1024 * 1024), 1),
+            }
+            for key, entry in self._models.items()
+        ]
+
 
 class Qwen3TTS:
     def __init__(self):
         self.model = None
+        self.registry = ModelRegistry()
+        self.precision = "fp32"
+        self.model_id = None
         self.device = None
+        self.speaker = None
+        # Speaker names the active model accepts (None if it cannot tell)
+        self.available_speakers = None
         self.sample_rate = 24000
+        # Torch thread configuration in use (None for the stub), see autotune_threads()
+        self.threads = None
+        # Text lengths profiled by warmup() (None for the plain warmup), and what the last warmup did
+        self.warmup_buckets = None
+        self.warmup_report = None
+        # Set from another thread to abort the running generation
+        self.cancel_event = threading.Event()
+
+    def init_model(self, model_size: str = None, progress=None, warmup: bool = False,
+                   memory_budget_mb: int = None, cpu_precision: str = "fp32", stub_rtf: float = 0.0,
+                   autotune_threads: bool = False, speaker: str = None, speakers=(),
+                   compile_model: bool = False, compile_mode: str = "default",
+                   warmup_buckets=None):
+        """
+        Initialize the Qwen3-TTS model.
 
-    def init_model(self):
-        """Initialize the Qwen3-TTS model."""
+        Args:
+            model_size: Variant key from MODEL_VARIANTS (e.g. "0.6B", "1.7B")
+                or a full model id; defaults to DEFAULT_MODEL_SIZE
+            progress: Optional callback, called as progress(stage, elapsed_s)
+                after each loading stage
+            warmup: Also warm the model before returning (see warmup())
+            memory_budget_mb: Memory budget for keeping loaded variants around
+            cpu_precision: "fp32", "int8" (dynamic quantization of linear
+                layers) or "bf16" (autocast); ignored on CUDA
+            stub_rtf: Simulated real-time factor when model_size is "stub"
+            autotune_threads: On CPU, use the stored or autotuned thread count
+            speaker: Default speaker for commands that do not name one
+            speakers: Speakers to prepare now, so the first use of each
+                costs nothing extra
+            compile_model: Compile the decoder with torch.compile and warm
+                the length buckets (ignored for the stub)
+            compile_mode: torch.compile mode, one of COMPILE_MODES
+            warmup_buckets: Text lengths (characters) for a profiled warmup
+                (see warmup()); None keeps the warmup to one short text
+        """
+        started = time.perf_counter()
+
+        def report(stage):
+            if progress is not None:
+                progress(stage, round(time.perf_counter() - started, 3))
+
+        previous_key = (self.model_id, self.precision)
+        previous_device = self.device
         try:
-            # Detect device
-            if torch.cuda.is_available():
-                self.device = torch.device("cuda:0")
-                dtype = torch.float32  # Use float32 for CUDA (more stable than float16)
-                print(f"CUDA available! Using GPU: {torch.cuda.get_device_name(0)}", file=sys.stderr, flush=True)
-                print(f"CUDA version: {torch.version.cuda}", file=sys.stderr, flush=True)
+            model_id = resolve_model_id(model_size)
+
+            if model_id == STUB_MODEL_ID:
+                # No torch, no weights: see stub_model.py
+                report("imports")
+                self.device = "cpu"
+                precision = "fp32"
+                loader = lambda: StubModel(on_step=self._check_cancelled)  # noqa: E731
             else:
-                self.device = torch.device("cpu")
-                dtype = torch.float32  # Use float32 for CPU
-                print("CUDA not available, using CPU", file=sys.stderr, flush=True)
+                import_torch()
+                report("imports")
 
-            # Load Qwen3-TTS model (redirect stdout to prevent library messages)
-            _stdout = sys.stdout
-            sys.stdout = sys.stderr
+                # Detect device
+                if torch.cuda.is_available():
+                    self.device = torch.device("cuda:0")
+                    dtype = torch.float32  # Use float32 for CUDA (more stable than float16)
+                    print(f"CUDA available! Using GPU: {torch.cuda.get_device_name(0)}", file=sys.stderr, flush=True)
+                    print(f"CUDA version: {torch.version.cuda}", file=sys.stderr, flush=True)
+                else:
+                    self.device = torch.device("cpu")
+                    dtype = torch.float32  # Use float32 for CPU
+                    print("CUDA not available, using CPU", file=sys.stderr, flush=True)
 
-            try:
-                from qwen_tts import Qwen3TTSModel
+                if memory_budget_mb is not None:
+                    self.registry.budget_bytes = int(memory_budget_mb) * 1024 * 1024
+                elif self.registry.budget_bytes is None:
+                    self.registry.budget_bytes = default_memory_budget()
 
-                # Use the CustomVoice model with pre-defined speakers
-                # Using 0.6B variant for faster generation (smaller model)
-                device_str = "cuda" if torch.cuda.is_available() else "cpu"
+                precision = self._resolve_precision(cpu_precision)
+                loader = lambda: self._load_model(model_id, dtype, precision)  # noqa: E731
 
-                self.model = Qwen3TTSModel.from_pretrained(
-                    "Qwen/Qwen3-TTS-12Hz-0.6B-CustomVoice",
-                    device_map=device_str,
-                    torch_dtype=dtype,
+            # Switching to an already loaded variant is a lookup
+            key = (model_id, precision)
+            loading = key not in self.registry
+            if loading:
+                # Let the registry free the active model if the new one needs its room
+                self.model = None
+            try:
+                self.model = self.registry.get(
+                    key,
+                    loader,
+                    estimate_bytes=estimate_model_bytes(model_id, precision),
+                    model_id=model_id,
+                    precision=precision,
                 )
+            except Exception:
+                # Keep serving the previous model if it survived eviction; otherwise report
+                # no model at all rather than a model_id the placeholder output would be cached under
+                self.model = self.registry.loaded(previous_key)
+                self.device = previous_device
+                if self.model is None:
+                    self.model_id = None
+                raise
+            self.precision = precision
+            if model_id == STUB_MODEL_ID:
+                self.model.rtf = stub_rtf
+            report("weights_loaded")
 
-                # Verify model is on correct device (if the model has a .model attribute)
-                try:
-                    if hasattr(self.model, 'model'):
-                        param_device = next(self.model.model.parameters()).device
-                        print(f"Model loaded on device: {param_device}", file=sys.stderr, flush=True)
-                    else:
-                        print(f"Model loaded with device_map: {device_str}", file=sys.stderr, flush=True)
-                except Exception as e:
-                    print(f"Model loaded (device verification skipped: {e})", file=sys.stderr, flush=True)
+            # A warmup report describes the previous model
+            if loading or key != previous_key:
+                self.warmup_report = None
+            self.model_id = model_id
+            self.sample_rate = 12000  # 12Hz model uses 12kHz sample rate
+            self.available_speakers = self.supported_speakers()
+            self.speaker = self.resolve_speaker(speaker or DEFAULT_SPEAKER)
+            for name in speakers or ():
+                self.resolve_speaker(name)
+            report("on_device")
 
-            finally:
-                sys.stdout = _stdout
+            if model_id == STUB_MODEL_ID:
+                self.threads = None
+            elif autotune_threads and self.device.type == "cpu":
+                self.autotune_threads()
+                report("threads_tuned")
+            else:
+                self.threads = self._thread_config("default")
 
-            # Set a default speaker (Ryan is a good default)
-            self.speaker = "Ryan"
-            self.sample_rate = 12000  # 12Hz model uses 12kHz sample rate
+            self.warmup_buckets = tuple(sorted({int(chars) for chars in warmup_buckets})) if warmup_buckets else None
+            compiled_now = compile_model and model_id != STUB_MODEL_ID and self.compiled is None
+            if compiled_now:
+                self.compile_model(compile_mode)
+                report("compiled")
+
+            # Compiling already warmed every bucket
+            if warmup and not compiled_now:
+                self.warmup()
+                report("warmed")
 
             return str(self.device)
 
         except Exception as e:
             raise RuntimeError(f"Failed to initialize model: {e}")
 
-    def warmup(self):
-        """Warmup the model with a test generation."""
+    def _resolve_precision(self, cpu_precision: str) -> str:
+        """Pick the precision actually used for the requested CPU mode."""
+        cpu_precision = cpu_precision or "fp32"
+        if cpu_precision not in CPU_PRECISIONS:
+            raise ValueError(f"Unknown cpu_precision: {cpu_precision}. Available: {', '.join(CPU_PRECISIONS)}")
+        if torch.cuda.is_available():
+            return "fp32"
+        if cpu_precision == "bf16" and not cpu_supports_bf16():
+            print("bf16 requested but this CPU has no native bf16 support, using fp32",
+                  file=sys.stderr, flush=True)
+            return "fp32"
+        return cpu_precision
+
+    def _inference_context(self):
+        """Inference mode plus autocast for the active precision (nothing for the stub)."""
+        if self.model_id == STUB_MODEL_ID:
+            return contextlib.nullcontext()
+        stack = contextlib.ExitStack()
+        stack.enter_context(torch.inference_mode())
+        if self.precision == "bf16":
+            stack.enter_context(torch.autocast("cpu", dtype=torch.bfloat16))
+        return stack
+
+    def _load_model(self, model_id: str, dtype, precision: str = "fp32"):
+        """Load one model variant from the Hugging Face hub or cache."""
+        from qwen_tts import Qwen3TTSModel
+
+        # Use the CustomVoice model with pre-defined speakers
+        device_str = "cuda" if torch.cuda.is_available() else "cpu"
+
+        model = Qwen3TTSModel.from_pretrained(
+            model_id,
+            device_map=device_str,
+            torch_dtype=dtype,
+        )
+
+        # Verify model is on correct device (if the model has a .model attribute)
+        try:
+            if hasattr(model, 'model'):
+                param_device = next(model.model.parameters()).device
+                print(f"Model loaded on device: {param_device}", file=sys.stderr, flush=True)
+            else:
+                print(f"Model loaded with device_map: {device_str}", file=sys.stderr, flush=True)
+        except Exception as e:
+            print(f"Model loaded (device verification skipped: {e})", file=sys.stderr, flush=True)
+
+        if precision == "int8":
+            # Weights of every nn.Linear become int8; activations are quantized on the fly
+            module = getattr(model, "model", None)
+            if isinstance(module, torch.nn.Module):
+                torch.ao.quantization.quantize_dynamic(
+                    module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+                )
+                print("Applied dynamic int8 quantization to linear layers", file=sys.stderr, flush=True)
+
+        self._install_cancel_hook(model)
+        return model
+
+    def _install_cancel_hook(self, model):
+        """Check for cancellation before every forward pass (i.e. every decode step)."""
+        module = getattr(model, "model", None)
+        if isinstance(module, torch.nn.Module):
+            module.register_forward_pre_hook(self._check_cancelled)
+
+    def _check_cancelled(self, *_):
+        if self.cancel_event.is_set():
+            raise GenerationCancelled()
+
+    def supported_speakers(self) -> list:
+        """Speaker names the loaded model accepts, or None if it cannot tell."""
+        get_speakers = getattr(self.model, "get_supported_speakers", None)
+        if get_speakers is None:
+            return None
+        return list(get_speakers() or []) or None
+
+    def resolve_speaker(self, speaker: str) -> str:
+        """The canonical spelling of speaker for the active model; raises ValueError for an unknown one."""
+        return canonical_speaker(speaker, self.available_speakers)
+
+    def describe_speakers(self) -> dict:
+        """Default speaker and the model's speakers, for the init response."""
+        return {"default": self.speaker, "available": self.available_speakers}
+
+    def _thread_config(self, source: str) -> dict:
+        return {
+            "num_threads": torch.get_num_threads(),
+            "interop_threads": torch.get_num_interop_threads(),
+            "source": source,
+        }
+
+    @property
+    def compiled(self):
+        """Compile report for the active model, or None if it runs eagerly."""
+        return self.registry.compile_report((self.model_id, self.precision))
+
+    def compile_model(self, mode: str = "default", cache_dir=None) -> dict:
+        """
+        Compile the decoder stacks with torch.compile and warm the length buckets.
+
+        See compile_cache.py for what is compiled and how compiled kernels
+        persist across launches. AUTOTUNE_TEXT is timed before and after, so
+        the report has the steady-state speedup; compile_s is the bucket
+        warmup time, which includes compiling (or loading from the cache).
+        """
+        if mode not in COMPILE_MODES:
+            raise ValueError(f"Unknown compile_mode: {mode}. Available: {', '.join(COMPILE_MODES)}")
+        module = getattr(self.model, "model", None)
+        stacks = decoder_modules(torch, module) if isinstance(module, torch.nn.Module) else []
+        if not stacks:
+            raise RuntimeError("No transformer layers found to compile")
+
+        directory = Path(cache_dir or default_compile_dir())
+        configure_compile(torch, directory)
+        signature = machine_signature(torch.__version__, self.model_id, self.precision)
+        path = artifacts_path(directory, f"{signature}|{mode}")
+        loaded = load_artifacts(torch, path)
+
+        # Eager baseline, after one call so first-call costs are excluded
+        self.synthesize("Hello.")
+        eager_rtf = self._measure_rtf()
+
+        for stack in stacks:
+            stack.compile(dynamic=True, mode=mode)
+        started = time.perf_counter()
+        self._warm_buckets()
+        compile_s = time.perf_counter() - started
+        compiled_rtf = self._measure_rtf()
+
+        try:
+            saved = save_artifacts(torch, path)
+        except OSError as e:
+            print(f"Could not save compile artifacts: {e}", file=sys.stderr, flush=True)
+            saved = False
+
+        report = {
+            "mode": mode,
+            "modules": len(stacks),
+            "compile_s": round(compile_s, 3),
+            "artifacts_loaded": loaded,
+            "artifacts_saved": saved,
+            "eager_rtf": round(eager_rtf, 4),
+            "compiled_rtf": round(compiled_rtf, 4),
+            "speedup": round(eager_rtf / compiled_rtf, 3) if compiled_rtf else None,
+        }
+        print(f"Compiled {len(stacks)} decoder stack(s) in {compile_s:.1f}s, "
+              f"RTF {eager_rtf:.3f} -> {compiled_rtf:.3f}", file=sys.stderr, flush=True)
+        self.registry.set_compile_report((self.model_id, self.precision), report)
+        return report
+
+    def _measure_rtf(self, text: str = AUTOTUNE_TEXT) -> float:
+        """Real-time factor of one synthesis of text (fixed seed)."""
+        if torch is not None:
+            torch.manual_seed(0)
+        start = time.perf_counter()
+        audio, sample_rate = self.synthesize(text)
+        return (time.perf_counter() - start) / (audio.shape[0] / sample_rate)
+
+    def _warm_buckets(self):
+        """One generation per warmup bucket (WARMUP_BUCKETS unless init gave some), plus a batched call."""
+        buckets = self.warmup_buckets or WARMUP_BUCKETS
+        for chars in buckets:
+            self.synthesize(warmup_text(chars))
+        text = warmup_text(buckets[0])
+        self.synthesize_batch([text, text], [1.0, 1.0])
+
+    def autotune_threads(self, profile_path=None) -> dict:
+        """
+        Pick the intra-op thread count with the best RTF on AUTOTUNE_TEXT.
+
+        A configuration stored for this machine is applied without tuning.
+        Otherwise every candidate from candidate_thread_counts() is timed once
+        after a warmup run, and the fastest is applied and stored. Inter-op
+        threads can only be set before torch starts any parallel work, so
+        they are fixed at 1 (decoding is sequential) rather than tuned.
+        """
+        signature = machine_signature(torch.__version__, self.model_id, self.precision)
+        stored = load_profile(signature, profile_path)
+        if stored is not None:
+            self._apply_threads(stored["num_threads"], stored.get("interop_threads"))
+            self.threads = {**self._thread_config("profile"), "rtf": stored.get("rtf")}
+            return self.threads
+
+        self._apply_threads(None, 1)
+        self.warmup()
+
+        trials = []
+        for count in candidate_thread_counts(torch.get_num_threads()):
+            torch.set_num_threads(count)
+            rtf = self._measure_rtf()
+            trials.append({"num_threads": count, "rtf": round(rtf, 4)})
+            print(f"Autotune: {count} threads, RTF {rtf:.3f}", file=sys.stderr, flush=True)
+
+        best = min(trials, key=lambda trial: trial["rtf"])
+        torch.set_num_threads(best["num_threads"])
+        try:
+            save_profile(signature, {
+                "num_threads": best["num_threads"],
+                "interop_threads": torch.get_num_interop_threads(),
+                "rtf": best["rtf"],
+            }, profile_path)
+        except OSError as e:
+            print(f"Could not save thread profile: {e}", file=sys.stderr, flush=True)
+
+        self.threads = {**self._thread_config("autotuned"), "rtf": best["rtf"], "trials": trials}
+        return self.threads
+
+    @staticmethod
+    def _apply_threads(num_threads, interop_threads):
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        if interop_threads and interop_threads != torch.get_num_interop_threads():
+            try:
+                torch.set_num_interop_threads(interop_threads)
+            except RuntimeError:
+                # Too late once inter-op parallel work has run in this process
+                pass
+
+    def warmup(self, force: bool = False, profile_path=None) -> dict:
+        """
+        Warm the model with a test generation.
+
+        Without warmup buckets this is one short generation, so init stays
+        cheap. With buckets (init's warmup_buckets), the first launch
+        synthesizes one text per bucket twice, cold and warm, and stores the
+        latency curve in the warmup profile (see warmup_profile.py).
+        Launches with a stored profile only warm the buckets it marks as
+        needing it, once each; force profiles again. A compiled model always
+        warms every bucket once, since compiled graphs are only loaded when a
+        shape is first seen.
+
+        Returns:
+            dict: What was warmed ("source": "default" | "profiled" |
+            "profile" | "compiled"), the elapsed time and, when profiled,
+            the per-bucket curve
+        """
         try:
             if self.model is None:
                 raise RuntimeError("Model not initialized")
 
-            # Generate a short test audio to warm up caches
-            self.generate("Hello.", speed=1.0, temperature=0.1)
+            started = time.perf_counter()
+            if self.compiled is not None:
+                self._warm_buckets()
+                report = {"source": "compiled", "buckets": list(self.warmup_buckets or WARMUP_BUCKETS)}
+            elif self.warmup_buckets is None:
+                # Generate a short test audio to warm up caches
+                self.synthesize("Hello.")
+                report = {"source": "default", "buckets": []}
+            else:
+                report = self._profiled_warmup(force, profile_path)
+            self.warmup_report = {**report, "elapsed_s": round(time.perf_counter() - started, 3)}
+            return self.warmup_report
 
         except Exception as e:
             raise RuntimeError(f"Warmup failed: {e}")
 
+    def _profiled_warmup(self, force: bool, profile_path) -> dict:
+        torch_version = torch.__version__ if torch is not None else "none"
+        signature = warmup_signature(
+            machine_signature(torch_version, self.model_id, self.precision), self.warmup_buckets
+        )
+        stored = None if force else load_warmup_profile(signature, profile_path)
+        if stored is not None:
+            for chars in stored["needed"]:
+                self.synthesize(warmup_text(chars))
+            return {"source": "profile", "buckets": stored["needed"], "curve": stored["curve"]}
+
+        curve = []
+        for chars in self.warmup_buckets:
+            text = warmup_text(chars)
+            runs = []
+            for _ in range(2):
+                start = time.perf_counter()
+                audio, sample_rate = self.synthesize(text)
+                runs.append(time.perf_counter() - start)
+            curve.append({
+                "chars": chars,
+                "cold_ms": round(runs[0] * 1000, 1),
+                "warm_ms": round(runs[1] * 1000, 1),
+                "rtf": round(runs[1] / (audio.shape[0] / sample_rate), 4),
+            })
+            print(f"Warmup: {chars} chars, cold {runs[0] * 1000:.0f} ms, warm {runs[1] * 1000:.0f} ms",
+                  file=sys.stderr, flush=True)
+
+        try:
+            entry = save_warmup_profile(signature, curve, profile_path)
+        except OSError as e:
+            print(f"Could not save warmup profile: {e}", file=sys.stderr, flush=True)
+            entry = {"curve": curve}
+        return {"source": "profiled", "buckets": list(self.warmup_buckets), **entry}
+
     def generate(self, text: str, speed: float = 1.0, temperature: float = 0.1):
         """
         Generate speech from text.
@@ -153,159 +883,945 @@ class Qwen3TTS:
         Returns:
             tuple: (wav_bytes, sample_rate)
         """
+        audio, sr = self.synthesize(text, speed, temperature)
+        return to_wav_bytes(audio, sr), sr
+
+    def synthesize(self, text: str, speed: float = 1.0, temperature: float = 0.1, speaker: str = None):
+        """
+        Generate speech from text as raw samples.
+
+        Args:
+            text: Text to synthesize
+            speed: Speech speed multiplier (default 1.0)
+            temperature: Generation temperature (default 0.1)
+            speaker: Speaker name (default: the init speaker)
+
+        Returns:
+            tuple: (audio, sample_rate) with audio as a float32 array in [-1, 1]
+        """
+        return self.synthesize_batch([text], [speed], temperature, speakers=[speaker])[0]
+
+    def synthesize_batch(self, texts: list, speeds: list, temperature: float = 0.1, timings=NO_TIMINGS,
+                         speakers: list = None):
+        """
+        Generate speech for several texts in one model call.
+
+        Args:
+            texts: Texts to synthesize
+            speeds: Speech speed multiplier for each text
+            temperature: Generation temperature (default 0.1)
+            timings: Optional Timings that receives the generate, to_numpy,
+                speed and to_float32 stages
+            speakers: Speaker for each text (None entries, or no list, use
+                the default speaker)
+
+        Returns:
+            list: (audio, sample_rate) per text, in order, with audio as a
+            float32 array in [-1, 1]
+        """
+        timings.start()
         try:
             if self.model is None:
                 # For development/testing without actual model:
                 # Generate a simple sine wave as placeholder
-                duration = len(text) * 0.05  # ~50ms per character
-                t = np.linspace(0, duration, int(24000 * duration))
-                audio = np.sin(2 * np.pi * 440 * t) * 0.3  # 440 Hz tone
-                audio = (audio * 32767).astype(np.int16)
-
-                # Convert to WAV bytes
-                wav_bytes = self._to_wav_bytes(audio, 24000)
-                return wav_bytes, 24000
-
-            # Generate speech using Qwen3-TTS (redirect stdout to prevent library messages)
-            _stdout = sys.stdout
-            sys.stdout = sys.stderr
-            try:
-                # Ensure generation happens on the correct device
-                with torch.inference_mode():
-                    wavs, sr = self.model.generate_custom_voice(
-                        text=text,
-                        language="English",
-                        speaker=self.speaker,
-                    )
-            finally:
-                sys.stdout = _stdout
+                results = []
+                for text in texts:
+                    duration = len(text) * 0.05  # ~50ms per character
+                    t = np.linspace(0, duration, int(24000 * duration), dtype=np.float32)
+                    audio = np.sin(2 * np.pi * 440 * t) * 0.3  # 440 Hz tone
+                    results.append((audio.astype(np.float32, copy=False), 24000))
+                timings.mark("generate")
+                return results
 
-            # Convert to numpy array if needed
-            if torch.is_tensor(wavs[0]):
-                audio = wavs[0].cpu().numpy()
-            else:
-                audio = wavs[0]
+            # A single text is passed as-is; several go through the model's batch path
+            batched = len(texts) > 1
+            names = [
+                self.resolve_speaker(name) if name else self.speaker for name in speakers or [None] * len(texts)
+            ]
+            timings.mark("speaker_lookup")
 
-            # Apply speed adjustment if needed
-            if speed != 1.0:
-                audio = self._adjust_speed(audio, speed)
+            # Generate speech using Qwen3-TTS
+            with self._inference_context():
+                wavs, sr = self.model.generate_custom_voice(
+                    text=list(texts) if batched else texts[0],
+                    language=["English"] * len(texts) if batched else "English",
+                    speaker=names if batched else names[0],
+                )
+            timings.mark("generate")
+
+            results = []
+            for wav, speed in zip(wavs, speeds):
+                # Convert to numpy array if needed
+                audio = wav.cpu().numpy() if torch is not None and torch.is_tensor(wav) else wav
+                timings.mark("to_numpy")
+
+                # Apply speed adjustment if needed
+                if speed != 1.0:
+                    audio = self._adjust_speed(audio, speed, sr)
+                    timings.mark("speed")
 
-            # Ensure proper range for int16 conversion
-            if audio.dtype == np.float32 or audio.dtype == np.float64:
                 # Audio is expected to be in [-1, 1] range
-                audio = np.clip(audio, -1.0, 1.0)
-                audio = (audio * 32767).astype(np.int16)
-            elif audio.dtype != np.int16:
-                audio = audio.astype(np.int16)
+                results.append((to_float32(audio), sr))
+                timings.mark("to_float32")
 
-            # Convert to WAV bytes
-            wav_bytes = self._to_wav_bytes(audio, sr)
-            return wav_bytes, sr
+            return results
 
+        except GenerationCancelled:
+            raise
         except Exception as e:
             raise RuntimeError(f"Generation failed: {e}")
 
-    def _to_wav_bytes(self, audio: np.ndarray, sample_rate: int) -> bytes:
-        """Convert audio array to WAV bytes."""
-        import wave
+    def synthesize_stream(
+        self, text: str, speed: float = 1.0, temperature: float = 0.1, speaker: str = None, pieces: list = None
+    ):
+        """
+        Generate speech incrementally.
+
+        The text is split at clause boundaries (see split_for_streaming), unless
+        the caller already planned the pieces, and each piece is synthesized and
+        yielded as soon as it is done, so time-to-first-audio depends on the
+        first piece, not the whole text. Speed is applied by one TimeStretcher
+        across all pieces, so the stretch is continuous over chunk boundaries.
+
+        Yields:
+            tuple: (audio, sample_rate, final) with audio as a float32 array
+        """
+        if pieces is None:
+            pieces = split_for_streaming(text, speed=speed)
+        if not pieces:
+            yield np.zeros(0, dtype=np.float32), self.sample_rate, True
+            return
 
-        # Ensure audio is int16
-        if audio.dtype != np.int16:
-            audio = (audio * 32767).astype(np.int16)
+        stretcher = None
+        for index, piece in enumerate(pieces):
+            self._check_cancelled()
+            audio, sr = self.synthesize(piece, 1.0, temperature, speaker)
+            final = index == len(pieces) - 1
 
-        # Create WAV in memory
-        wav_buffer = io.BytesIO()
-        with wave.open(wav_buffer, 'wb') as wav_file:
-            wav_file.setnchannels(1)  # Mono
-            wav_file.setsampwidth(2)  # 16-bit
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(audio.tobytes())
+            if speed != 1.0:
+                if stretcher is None:
+                    stretcher = TimeStretcher(speed, sr)
+                audio = stretcher.process(audio)
+                if final:
+                    audio = np.concatenate((audio, stretcher.flush()))
 
-        return wav_buffer.getvalue()
+            yield audio, sr, final
 
-    def _adjust_speed(self, audio: np.ndarray, speed: float) -> np.ndarray:
+    def _adjust_speed(self, audio: np.ndarray, speed: float, sample_rate: int) -> np.ndarray:
         """Adjust audio speed without changing pitch."""
         if speed == 1.0:
             return audio
 
-        # Simple resampling for speed adjustment
-        # For production, use librosa.effects.time_stretch or similar
-        new_length = int(len(audio) / speed)
-        indices = np.linspace(0, len(audio) - 1, new_length)
-        return np.interp(indices, np.arange(len(audio)), audio)
+        return time_stretch(audio, speed, sample_rate)
 
 
-def main():
-    """Main server loop."""
-    tts = Qwen3TTS()
+_send_lock = threading.Lock()
 
-    # Signal ready
-    print(json.dumps({"status": "ok", "action": "ready"}), flush=True)
 
-    # Command loop
-    for line in sys.stdin:
-        try:
-            cmd = json.loads(line.strip())
-            action = cmd.get("action")
+# Binary stream for protocol messages; set by claim_protocol_stream()
+_protocol_stream = None
 
-            if action == "init":
-                device = tts.init_model()
-                print(json.dumps({
-                    "status": "ok",
-                    "action": "init",
-                    "device": device,
-                    "model_loaded": True
-                }), flush=True)
-
-            elif action == "warmup":
-                tts.warmup()
-                print(json.dumps({
-                    "status": "ok",
-                    "action": "warmup"
-                }), flush=True)
 
-            elif action == "generate":
-                text = cmd.get("text", "")
-                speed = cmd.get("speed", 1.0)
-                temperature = cmd.get("temperature", 0.1)
+def claim_protocol_stream():
+    """
+    Give the protocol a private copy of stdout and send everything else to stderr.
 
-                wav_bytes, sample_rate = tts.generate(text, speed, temperature)
-                audio_b64 = base64.b64encode(wav_bytes).decode('utf-8')
+    fd 1 is duplicated for the protocol, then fd 1 and sys.stdout are pointed
+    at stderr for the rest of the process lifetime. Anything a library prints,
+    from Python or native code, lands on stderr and can never corrupt the
+    protocol stream, so model calls need no stdout redirection.
+    """
+    global _protocol_stream
+    sys.stdout.flush()
+    fd = os.dup(sys.stdout.fileno())
+    if sys.platform == "win32":
+        import msvcrt
+        msvcrt.setmode(fd, os.O_BINARY)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+    _protocol_stream = os.fdopen(fd, "wb")
 
-                print(json.dumps({
-                    "status": "ok",
-                    "action": "generate",
-                    "audio": audio_b64,
-                    "sample_rate": sample_rate
-                }), flush=True)
 
-            elif action == "ping":
-                print(json.dumps({
-                    "status": "ok",
-                    "action": "ping",
-                    "model_loaded": tts.model is not None
-                }), flush=True)
+def send(message: dict, payload=None):
+    """Write a protocol message (and optional binary frame) to the protocol stream."""
+    with _send_lock:
+        write_message(_protocol_stream or sys.stdout.buffer, message, payload)
+
+
+class TTSServer:
+    """
+    Command loop for the sidecar.
+
+    The main thread reads stdin and queues work; a single worker thread runs
+    the commands in arrival order. Responses echo the command's "id" so the
+    client can match them without holding a lock across the round trip.
+    """
+
+    # Commands whose cost scales with text length (used for cancel savings)
+    GENERATE_ACTIONS = ("generate", "generate_many", "generate_stream")
+
+    def __init__(self, tts: Qwen3TTS):
+        self.tts = tts
+        self.work_queue = queue.Queue()
+        # Micro-batching of queued generate commands
+        self.max_batch_size = 8
+        self.batch_window = 0.005
+        self.max_batch_chars = 1200
+        # On-disk audio cache, configured by "init"
+        self.cache = None
+        # Worker processes in pool mode ("workers" > 1 in init), else None
+        self.pool = None
+        # Speakers the workers' model accepts (None if it cannot tell), in pool mode
+        self.pool_speakers = None
+        # Lookahead sessions; _prefetching is the job being synthesized, if any
+        self.prefetcher = Prefetcher()
+        self.prefetch_budget_s = 30.0
+        self._prefetching = None
+        # Last completed init stage while a model load is running, else None
+        self.loading = None
+        # Duration of the most recent stdout write (a response cannot time its own)
+        self.last_write_s = 0.0
+        # Command taken off the queue but not batched; processed next
+        self._carry = []
+        # Queued commands and the running ones, guarded by _lock
+        self._lock = threading.Lock()
+        self._pending = []
+        self._running = []
+        self._current_started = 0.0
+        self.saved_seconds = 0.0
+        self.stats = SidecarStats()
+        # Chunk planning for the "segment" action, learned from generate timings
+        self.segmenter = Segmenter()
+
+    def reply(self, cmd: dict, message: dict, payload=None):
+        """Send a response to cmd, tagged with its request id if it had one."""
+        if "id" in cmd:
+            message = {"id": cmd["id"], **message}
+        started = time.perf_counter()
+        send(message, payload)
+        self.last_write_s = time.perf_counter() - started
+        # The command's last message: nothing else may be sent for it
+        if message.get("action") != "init_progress" and message.get("final", True):
+            cmd["_answered"] = True
+
+        status = message.get("status")
+        self.stats.record_response(message.get("action"), status)
+        if (status == "ok" and "_received" in cmd
+                and (message.get("action") == "generate" or message.get("final"))):
+            self.stats.record_latency(time.perf_counter() - cmd["_received"])
+
+    def handle(self, cmd: dict) -> bool:
+        """Run one queued command. Returns False when the server should stop."""
+        action = cmd.get("action")
+
+        if action == "init":
+            self.max_batch_size = max(int(cmd.get("max_batch_size", self.max_batch_size)), 1)
+            self.batch_window = float(cmd.get("batch_window_ms", self.batch_window * 1000)) / 1000
+            self.max_batch_chars = int(cmd.get("max_batch_chars", self.max_batch_chars))
+            self.prefetch_budget_s = float(cmd.get("prefetch_budget_s", self.prefetch_budget_s))
+
+            if cmd.get("cache", True):
+                cache_format = cmd.get("cache_format", "packed")
+                if cache_format not in ("packed", "files"):
+                    raise ValueError(f"Unknown cache_format: {cache_format}. Available: packed, files")
+                store = SegmentStore if cache_format == "packed" else AudioCache
+                cache_dir = cmd.get("cache_dir") or default_cache_dir()
+                try:
+                    self.cache = store(cache_dir, int(cmd.get("cache_max_mb", 500)) * 1024 * 1024)
+                except OSError as e:
+                    # The cache is an optimization; an unusable directory must not stop the app
+                    print(f"Audio cache disabled, cannot use {cache_dir}: {e}", file=sys.stderr, flush=True)
+                    self.cache = None
+            else:
+                self.cache = None
+
+            def progress(stage, elapsed):
+                self.loading = stage
+                if cmd.get("progress"):
+                    self.reply(cmd, {
+                        "status": "ok",
+                        "action": "init_progress",
+                        "stage": stage,
+                        "elapsed_s": elapsed
+                    })
+
+            options = {
+                "model_size": cmd.get("model_size"),
+                "warmup": cmd.get("warmup", False),
+                "memory_budget_mb": cmd.get("memory_budget_mb"),
+                "cpu_precision": cmd.get("cpu_precision", "fp32"),
+                "stub_rtf": cmd.get("stub_rtf", 0.0),
+                "speaker": cmd.get("speaker"),
+                "speakers": cmd.get("speakers") or [],
+                "compile_model": cmd.get("compile", False),
+                "compile_mode": cmd.get("compile_mode", "default"),
+                "warmup_buckets": cmd.get("warmup_buckets"),
+            }
+            workers = max(int(cmd.get("workers", 1)), 1)
+
+            self.loading = "started"
+            try:
+                if workers > 1:
+                    info = self._init_pool(workers, cmd.get("threads_per_worker"), options)
+                    device, models, speakers = info["device"], info["models"], info["speakers"]
+                    compiled, warmed = info["compile"], info["warmup"]
+                else:
+                    self._close_pool()
+                    device = self.tts.init_model(
+                        progress=progress,
+                        autotune_threads=cmd.get("autotune_threads", False),
+                        **options
+                    )
+                    models = self.tts.registry.describe()
+                    speakers = self.tts.describe_speakers()
+                    compiled, warmed = self.tts.compiled, self.tts.warmup_report
+            finally:
+                self.loading = None
+
+            if self.pool is not None:
+                extra = {"workers": self.pool.size, "threads_per_worker": self.pool.threads_per_worker}
+            else:
+                extra = {"threads": self.tts.threads}
+            self.reply(cmd, {
+                "status": "ok",
+                "action": "init",
+                "device": device,
+                "model_loaded": True,
+                "model_id": self.tts.model_id,
+                "precision": self.tts.precision,
+                "models": models,
+                "speakers": speakers,
+                "compile": compiled,
+                "warmup": warmed,
+                **extra
+            })
+
+        elif action == "warmup":
+            report = (self.pool or self.tts).warmup(force=cmd.get("force", False))
+            self.reply(cmd, {
+                "status": "ok",
+                "action": "warmup",
+                "warmup": report
+            })
+
+        elif action == "generate":
+            self.handle_generate_batch([cmd])
 
-            elif action == "shutdown":
-                print(json.dumps({
+        elif action == "generate_many":
+            self.handle_generate_many(cmd)
+
+        elif action == "prefetch":
+            # Canonical name, so the keys match the ones generate builds
+            self._check_speaker(cmd)
+            speed = cmd.get("speed", 1.0)
+            temperature = cmd.get("temperature", 0.1)
+            speaker = cmd.get("speaker")
+            texts = [text for text in cmd.get("texts") or [] if isinstance(text, str) and text.strip()]
+            shared = {"speed": speed, "temperature": temperature, "speaker": speaker}
+            items = [(self._cache_key({**shared, "text": text}), text) for text in texts]
+            self.prefetcher.submit(
+                cmd.get("session"),
+                items,
+                speed,
+                temperature,
+                float(cmd.get("budget_s", self.prefetch_budget_s)),
+                speaker,
+            )
+            self.reply(cmd, {"status": "ok", "action": "prefetch", "sentences": len(items)})
+
+        elif action == "generate_stream":
+            text = cmd.get("text", "")
+            speed = cmd.get("speed", 1.0)
+            temperature = cmd.get("temperature", 0.1)
+            encoding = cmd.get("encoding", ENCODING_WAV_BASE64)
+            # Fail before any audio is produced rather than on the first chunk
+            check_encoding(encoding)
+            self._check_speaker(cmd)
+
+            # Planned here, where the latency model lives, also in pool mode
+            pieces = split_for_streaming(text, self.segmenter, speed)
+            started = piece_started = time.perf_counter()
+            produced = 0.0
+            for seq, (audio, sample_rate, final) in enumerate(
+                (self.pool or self.tts).synthesize_stream(text, speed, temperature, cmd.get("speaker"), pieces)
+            ):
+                produced += audio.shape[0] / sample_rate
+                if seq < len(pieces):
+                    self.segmenter.model.observe(
+                        len(pieces[seq]), time.perf_counter() - piece_started, audio.shape[0] / sample_rate * speed
+                    )
+                if final:
+                    self.stats.record_rtf(time.perf_counter() - started, produced)
+                    self.stats.record_audio(len(text), produced)
+                fields, payload = encode_audio(audio, sample_rate, encoding)
+                self.reply(cmd, {
                     "status": "ok",
-                    "action": "shutdown"
-                }), flush=True)
-                break
+                    "action": "generate_stream",
+                    "seq": seq,
+                    "final": final,
+                    **fields
+                }, payload)
+                piece_started = time.perf_counter()
+
+        elif action == "shutdown":
+            self.reply(cmd, {
+                "status": "ok",
+                "action": "shutdown"
+            })
+            return False
+
+        else:
+            self.reply(cmd, {
+                "status": "error",
+                "action": action,
+                "error": f"Unknown action: {action}"
+            })
+
+        return True
+
+    def _init_pool(self, workers: int, threads_per_worker, options: dict) -> dict:
+        """Start (or reuse) the worker pool and load the model in every worker."""
+        if self.pool is not None and (
+            self.pool.size != workers
+            or (threads_per_worker and self.pool.threads_per_worker != threads_per_worker)
+        ):
+            self._close_pool()
+        if self.pool is None:
+            self.pool = WorkerPool(workers, threads_per_worker, cancelled_error=GenerationCancelled)
+            # cancel() and the worker loop drive the event the workers watch
+            self.tts.cancel_event = self.pool.cancel_event
+
+        info = self.pool.init_model(**options)
+        # Cache keys are built from these, so they must describe the workers' model
+        self.tts.model_id = info["model_id"]
+        self.tts.precision = info["precision"]
+        self.tts.speaker = info["speaker"]
+        self.tts.sample_rate = info["sample_rate"]
+        self.pool_speakers = info["speakers"]["available"]
+        return info
+
+    def _close_pool(self):
+        if self.pool is None:
+            return
+        self.pool.close()
+        self.pool = None
+        self.tts.cancel_event = threading.Event()
+
+    @property
+    def model_loaded(self) -> bool:
+        return self.tts.model is not None or self.pool is not None
+
+    def _check_speaker(self, cmd: dict):
+        """Replace cmd's speaker with its canonical name; raises ValueError for an unknown one."""
+        if cmd.get("speaker"):
+            supported = self.pool_speakers if self.pool is not None else self.tts.available_speakers
+            cmd["speaker"] = canonical_speaker(cmd["speaker"], supported)
+
+    def _cache_key(self, cmd: dict) -> str:
+        """Cache key covering everything that changes the generated audio."""
+        return cache_key(
+            cmd.get("text", ""),
+            model=self.tts.model_id or "placeholder",
+            precision=self.tts.precision,
+            speaker=cmd.get("speaker") or self.tts.speaker,
+            temperature=cmd.get("temperature", 0.1),
+            speed=cmd.get("speed", 1.0),
+            sample_rate=self.tts.sample_rate,
+        )
+
+    def _reply_audio(self, cmd: dict, audio, sample_rate: int, timings=None, **extra):
+        """
+        Encode audio in the format cmd asked for and send the generate response.
+
+        If cmd asked for "timings", the response gets a "timings" object (ms)
+        combining JSON decode, the given stage timings and the encoding stages.
+        """
+        parent = cmd.get("_parent")
+        if parent is not None and parent.get("_cancelled"):
+            raise GenerationCancelled()
+        if cmd.get("_cancelled"):
+            self.reply(cmd, {"status": "cancelled", "action": "generate"})
+            return
 
+        encode_timings = Timings() if cmd.get("timings") else NO_TIMINGS
+        try:
+            fields, payload = encode_audio(
+                audio, sample_rate, cmd.get("encoding", ENCODING_WAV_BASE64), encode_timings
+            )
+        except Exception as e:
+            self._reply_error(cmd, str(e))
+            return
+        self.stats.record_audio(len(cmd.get("text", "")), audio.shape[0] / sample_rate)
+
+        if cmd.get("timings"):
+            extra["timings"] = {
+                "json_decode": round(cmd.get("_decode_s", 0.0) * 1000, 3),
+                **(timings.as_dict() if timings is not None else {}),
+                **encode_timings.as_dict(),
+                "prev_stdout_write": round(self.last_write_s * 1000, 3),
+            }
+
+        if parent is not None:
+            parent["_remaining"] -= 1
+            self.reply(parent, {
+                "status": "ok",
+                "action": "generate_many",
+                "index": cmd["_index"],
+                "final": parent["_remaining"] == 0,
+                **extra,
+                **fields
+            }, payload)
+            return
+
+        self.reply(cmd, {
+            "status": "ok",
+            "action": "generate",
+            **extra,
+            **fields
+        }, payload)
+
+    def _reply_error(self, cmd: dict, error: str):
+        """Answer one generate command with an error; a generate_many item answers through its parent."""
+        parent = cmd.get("_parent")
+        if parent is None:
+            self.reply(cmd, {"status": "error", "action": "generate", "error": error})
+            return
+        parent["_remaining"] -= 1
+        self.reply(parent, {
+            "status": "error",
+            "action": "generate_many",
+            "index": cmd["_index"],
+            "final": parent["_remaining"] == 0,
+            "error": error,
+        })
+
+    def handle_generate_many(self, cmd: dict):
+        """
+        Synthesize an ordered list of texts and answer each as it is ready.
+
+        Every text becomes an item that looks like a generate command, so
+        the items go through the same cache and micro-batching path.
+        """
+        texts = cmd.get("texts") or []
+        if not isinstance(texts, list):
+            raise ValueError("generate_many needs a list of texts")
+        # Checked before any batch runs, so a bad entry cannot cut the command off halfway
+        bad = [index for index, text in enumerate(texts) if not isinstance(text, str)]
+        if bad:
+            raise ValueError(f"generate_many texts must be strings (bad entries at index {', '.join(map(str, bad))})")
+        # Shared by every item, so one bad value fails the command once instead of once per text
+        check_encoding(cmd.get("encoding", ENCODING_WAV_BASE64))
+        self._check_speaker(cmd)
+
+        shared = {
+            key: cmd[key] for key in ("speed", "temperature", "speaker", "encoding", "timings") if key in cmd
+        }
+        items = [
+            {**shared, "text": text, "_parent": cmd, "_index": index, "_decode_s": cmd.get("_decode_s", 0.0)}
+            for index, text in enumerate(texts)
+        ]
+        cmd["_remaining"] = len(items)
+        if not items:
+            self.reply(cmd, {"status": "ok", "action": "generate_many", "final": True})
+            return
+
+        max_size, max_chars = self._batch_limits()
+        batch, chars = [], 0
+        for item in items:
+            text_chars = len(item["text"])
+            if batch and (len(batch) >= max_size or chars + text_chars > max_chars):
+                self.handle_generate_batch(batch)
+                batch, chars = [], 0
+            batch.append(item)
+            chars += text_chars
+        self.handle_generate_batch(batch)
+
+    def handle_generate_batch(self, batch: list):
+        """Run several generate commands as one model call and answer each."""
+        # An unknown speaker fails only its own command, not the commands batched with it
+        valid = []
+        for cmd in batch:
+            try:
+                self._check_speaker(cmd)
+            except ValueError as e:
+                self._reply_error(cmd, str(e))
+                continue
+            valid.append(cmd)
+        batch = valid
+
+        keys = {id(cmd): self._cache_key(cmd) for cmd in batch}
+        # Per-command lookup stages, merged into the batch's stages on a miss
+        lookups = {}
+        misses = []
+        for cmd in batch:
+            lookup = Timings() if cmd.get("timings") else NO_TIMINGS
+            timings = lookup if cmd.get("timings") else None
+            lookups[id(cmd)] = lookup
+
+            ready = self.prefetcher.take(keys[id(cmd)])
+            lookup.mark("prefetch_lookup")
+            if ready is not None:
+                self._reply_audio(cmd, *ready, timings=timings, prefetched=True)
+                continue
+
+            cached = self.cache.get(keys[id(cmd)]) if self.cache is not None else None
+            if self.cache is not None:
+                lookup.mark("cache_lookup")
+            if cached is None:
+                misses.append(cmd)
             else:
-                print(json.dumps({
-                    "status": "error",
-                    "action": action,
-                    "error": f"Unknown action: {action}"
-                }), flush=True)
+                self._reply_audio(cmd, *cached, timings=timings, cache="hit")
+        batch = misses
+        if not batch:
+            return
 
+        # Stage timings of a batched call are shared by its members
+        timings = Timings() if any(cmd.get("timings") for cmd in batch) else NO_TIMINGS
+        started = time.perf_counter()
+        texts = [cmd.get("text", "") for cmd in batch]
+        speeds = [cmd.get("speed", 1.0) for cmd in batch]
+        results = (self.pool or self.tts).synthesize_batch(
+            texts,
+            speeds,
+            batch[0].get("temperature", 0.1),
+            timings,
+            speakers=[cmd.get("speaker") for cmd in batch],
+        )
+        elapsed = time.perf_counter() - started
+        self.stats.record_rtf(elapsed, sum(audio.shape[0] / sample_rate for audio, sample_rate in results))
+        self.segmenter.model.observe(
+            sum(len(text) for text in texts),
+            elapsed,
+            sum(audio.shape[0] / sample_rate * speed for (audio, sample_rate), speed in zip(results, speeds)),
+        )
+
+        for cmd, (audio, sample_rate) in zip(batch, results):
+            extra = {"batch_size": len(batch)}
+            if self.cache is not None:
+                extra["cache"] = "miss"
+            stages = lookups[id(cmd)].merged(timings) if cmd.get("timings") else None
+            self._reply_audio(cmd, audio, sample_rate, timings=stages, **extra)
+
+            # Placeholder audio (no model loaded) is never cached
+            if self.cache is not None and self.model_loaded:
+                try:
+                    self.cache.put(keys[id(cmd)], audio, sample_rate)
+                except OSError as e:
+                    print(f"Audio cache write failed: {e}", file=sys.stderr, flush=True)
+
+    def _next_command(self):
+        """
+        Take the next command, starting with one left over from batching.
+
+        While the queue is empty, prefetch jobs run one sentence at a time.
+        """
+        if self._carry:
+            return self._carry.pop()
+        while True:
+            job = self.prefetcher.next_job()
+            if job is None:
+                return self.work_queue.get()
+            try:
+                return self.work_queue.get_nowait()
+            except queue.Empty:
+                self._run_prefetch(job)
+
+    def _run_prefetch(self, job):
+        """Synthesize one sentence ahead of the reader, unless it is pre-empted."""
+        cached = self.cache.get(job.key) if self.cache is not None else None
+        if cached is not None:
+            self.prefetcher.complete(job, *cached, synthesized=False)
+            return
+
+        with self._lock:
+            if self._pending:
+                # A command arrived since the queue was checked
+                return
+            self._prefetching = job
+            self.tts.cancel_event.clear()
+
+        started = time.perf_counter()
+        try:
+            ((audio, sample_rate),) = (self.pool or self.tts).synthesize_batch(
+                [job.text], [job.speed], job.temperature, speakers=[job.speaker]
+            )
+        except GenerationCancelled:
+            self.prefetcher.record_preempted()
+            return
         except Exception as e:
-            print(json.dumps({
-                "status": "error",
-                "action": cmd.get("action", "unknown") if 'cmd' in locals() else "unknown",
-                "error": str(e)
-            }), flush=True)
+            print(f"Prefetch failed: {e}", file=sys.stderr, flush=True)
+            self.prefetcher.fail(job)
+            return
+        finally:
+            with self._lock:
+                self._prefetching = None
+
+        elapsed = time.perf_counter() - started
+        self.stats.record_rtf(elapsed, audio.shape[0] / sample_rate)
+        self.segmenter.model.observe(len(job.text), elapsed, audio.shape[0] / sample_rate * job.speed)
+        self.prefetcher.complete(job, audio, sample_rate)
+        if self.cache is not None and self.model_loaded:
+            try:
+                self.cache.put(job.key, audio, sample_rate)
+            except OSError as e:
+                print(f"Audio cache write failed: {e}", file=sys.stderr, flush=True)
+
+    def _batch_limits(self):
+        """
+        Maximum commands and characters per batch.
+
+        In pool mode a batch should keep every worker busy, and each worker
+        gets its own share of the character budget.
+        """
+        workers = self.pool.size if self.pool is not None else 1
+        return max(self.max_batch_size, workers), self.max_batch_chars * workers
+
+    def _collect_batch(self, first: dict) -> list:
+        """
+        Gather generate commands queued right behind `first`.
+
+        Waits at most batch_window for more to arrive and stops at the first
+        command that is not a generate or would exceed the batch budget; that
+        command is carried over so ordering is preserved.
+        """
+        batch = [first]
+        chars = len(first.get("text", ""))
+        deadline = time.perf_counter() + self.batch_window
+        max_size, max_chars = self._batch_limits()
+
+        while len(batch) < max_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    cmd = self.work_queue.get(timeout=remaining)
+                else:
+                    cmd = self.work_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            text_chars = len(cmd.get("text", "")) if cmd is not None else 0
+            if cmd is None or cmd.get("action") != "generate" or chars + text_chars > max_chars:
+                self._carry.append(cmd)
+                break
+
+            batch.append(cmd)
+            chars += text_chars
+
+        return batch
+
+    def _estimate_seconds(self, cmd: dict) -> float:
+        """Estimate how long a queued command would take to generate, from the latency model."""
+        if cmd.get("action") not in self.GENERATE_ACTIONS:
+            return 0.0
+        overhead, per_char, _ = self.segmenter.model.coefficients()
+        if cmd.get("action") == "generate_many":
+            texts = [text for text in cmd.get("texts") or [] if isinstance(text, str)]
+            return overhead * len(texts) + per_char * sum(len(text) for text in texts)
+        return overhead + per_char * len(cmd.get("text", ""))
+
+    def cancel(self, target_id=None, session=None) -> dict:
+        """
+        Cancel the running command and drop queued ones matching target_id or session.
+
+        Returns a summary including the estimated generation time saved.
+        """
+        def matches(cmd):
+            if target_id is not None and cmd.get("id") == target_id:
+                return True
+            return session is not None and cmd.get("session") == session
+
+        with self._lock:
+            dropped = [cmd for cmd in self._pending if matches(cmd) and not cmd.get("_cancelled")]
+            for cmd in dropped:
+                cmd["_cancelled"] = True
+            saved = sum(self._estimate_seconds(cmd) for cmd in dropped)
+
+            # Running batch members are marked so their results are discarded;
+            # the model call itself is only aborted once nothing in it is wanted
+            running = [cmd for cmd in self._running if matches(cmd) and not cmd.get("_cancelled")]
+            for cmd in running:
+                cmd["_cancelled"] = True
+            if running and all(cmd.get("_cancelled") for cmd in self._running):
+                self.tts.cancel_event.set()
+                elapsed = time.perf_counter() - self._current_started
+                saved += max(sum(self._estimate_seconds(cmd) for cmd in self._running) - elapsed, 0.0)
+
+            self.saved_seconds += saved
+
+        if session is not None and self.prefetcher.stop(session):
+            with self._lock:
+                if self._prefetching is not None and self._prefetching.session == session:
+                    self.tts.cancel_event.set()
+
+        return {
+            "cancelled_queued": len(dropped),
+            "cancelled_running": len(running),
+            "estimated_saved_s": round(saved, 3),
+        }
+
+    def worker_loop(self):
+        """Execute queued commands until shutdown or end of input."""
+        while True:
+            cmd = self._next_command()
+            if cmd is None:
+                return
+
+            batch = self._collect_batch(cmd) if cmd.get("action") == "generate" else [cmd]
+
+            with self._lock:
+                for queued in batch:
+                    self._pending.remove(queued)
+                skipped = [queued for queued in batch if queued.get("_cancelled")]
+                batch = [queued for queued in batch if not queued.get("_cancelled")]
+                self._running = batch
+                self._current_started = time.perf_counter()
+                self.tts.cancel_event.clear()
+
+            for queued in skipped:
+                self.reply(queued, {"status": "cancelled", "action": queued.get("action", "unknown")})
+            if not batch:
+                continue
+
+            try:
+                if batch[0].get("action") == "generate":
+                    self.handle_generate_batch(batch)
+                elif not self.handle(batch[0]):
+                    return
+            except GenerationCancelled:
+                # Members answered before the failure (e.g. cache hits) keep their reply
+                for running in [queued for queued in batch if not queued.get("_answered")]:
+                    self.reply(running, {
+                        "status": "cancelled",
+                        "action": running.get("action", "unknown"),
+                        "elapsed_s": round(time.perf_counter() - self._current_started, 3)
+                    })
+            except Exception as e:
+                for running in [queued for queued in batch if not queued.get("_answered")]:
+                    self.reply(running, {
+                        "status": "error",
+                        "action": running.get("action", "unknown"),
+                        "error": str(e)
+                    })
+            finally:
+                with self._lock:
+                    self._running = []
+
+    def collect_stats(self) -> dict:
+        """Snapshot of the cumulative metrics for the "stats" action."""
+        peak_rss = peak_rss_bytes()
+        with self._lock:
+            saved = self.saved_seconds
+        return {
+            **self.stats.snapshot(),
+            "estimated_saved_s": round(saved, 3),
+            "pending": self.work_queue.qsize(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "prefetch": self.prefetcher.stats(),
+            "segmenter": self.segmenter.model.describe(),
+            "peak_rss_mb": round(peak_rss / (1024 * 1024), 1) if peak_rss is not None else None,
+            "torch_allocator": torch_allocator_stats(torch),
+        }
+
+    def dispatch(self, cmd: dict) -> bool:
+        """
+        Handle a command on the reader thread.
+
+        Cheap commands are answered immediately; everything else is queued for
+        the worker. Returns False once no more input should be read.
+        """
+        action = cmd.get("action")
+
+        if action == "ping":
+            self.reply(cmd, {
+                "status": "ok",
+                "action": "ping",
+                "model_loaded": self.model_loaded,
+                "loading": self.loading,
+                "pending": self.work_queue.qsize()
+            })
+            return True
+
+        if action == "cancel":
+            summary = self.cancel(cmd.get("target_id"), cmd.get("session"))
+            self.reply(cmd, {"status": "ok", "action": "cancel", **summary})
+            return True
+
+        if action == "stats":
+            self.reply(cmd, {"status": "ok", "action": "stats", **self.collect_stats()})
+            return True
+
+        if action == "segment":
+            try:
+                plan = self.segmenter.plan(
+                    str(cmd.get("text", "")),
+                    float(cmd.get("first_latency_ms", 500)) / 1000,
+                    max(int(cmd.get("max_chars", 300)), 1),
+                    float(cmd.get("speed", 1.0)),
+                )
+            except (TypeError, ValueError) as e:
+                self.reply(cmd, {"status": "error", "action": "segment", "error": str(e)})
+                return True
+            self.reply(cmd, {
+                "status": "ok",
+                "action": "segment",
+                **plan,
+                "model": self.segmenter.model.describe()
+            })
+            return True
+
+        with self._lock:
+            self._pending.append(cmd)
+            # Foreground work pre-empts prefetch, unless it is waiting for that very sentence
+            job = self._prefetching
+            if job is not None and not (action == "generate" and self._cache_key(cmd) == job.key):
+                self.tts.cancel_event.set()
+        self.work_queue.put(cmd)
+        return action != "shutdown"
+
+    def run(self):
+        """Main server loop."""
+        worker = threading.Thread(target=self.worker_loop, name="tts-worker", daemon=True)
+        worker.start()
+
+        # Signal ready
+        send({"status": "ok", "action": "ready", "encodings": list(ENCODINGS)})
+
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                decode_started = time.perf_counter()
+                cmd = json.loads(line)
+                if not isinstance(cmd, dict):
+                    raise ValueError("Command must be a JSON object")
+                cmd["_decode_s"] = time.perf_counter() - decode_started
+                cmd["_received"] = decode_started
+            except Exception as e:
+                self.reply({}, {
+                    "status": "error",
+                    "action": "unknown",
+                    "error": f"Invalid command: {e}"
+                })
+                continue
+
+            self.stats.record_request(cmd.get("action"))
+
+            if not self.dispatch(cmd):
+                break
+        else:
+            # End of input: let queued work finish, then stop
+            self.work_queue.put(None)
+
+        worker.join()
+        self._close_pool()
+
+
+def main():
+    """Main server loop."""
+    claim_protocol_stream()
+    TTSServer(Qwen3TTS()).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Offline audiobook renderer.
+
+Reads a plain-text or EPUB book, splits it into chapters and sentences, and
+synthesizes everything with Qwen3TTS, using all cores through the sidecar's
+worker pool (see worker_pool.py). For each chapter it writes a 16-bit mono
+WAV plus a JSON manifest giving every sentence's text, character offsets in
+the chapter text and sample/second offsets in the audio. A book-level
+manifest.json lists the chapters.
+
+Rendering is resumable: every synthesized sentence is stored in a packed,
+content-addressed segment store (see segment_store.py) inside the output
+directory as soon as it is ready, so after a crash or Ctrl+C a rerun only synthesizes what is missing,
+and chapters whose manifest is already complete are skipped. Progress, the
+measured RTF and an ETA are printed to stderr.
+
+Run from the repository root:
+    python python-tts/render_book.py book.epub --out-dir book-audio
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import wave
+import zipfile
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+from pathlib import Path
+
+import numpy as np
+
+from audio_cache import cache_key
+from fsutil import atomic_write
+from qwen3_tts_cuda import GenerationCancelled, Qwen3TTS
+from segment_store import SegmentStore
+from segmenter import pack_sentences
+from tts_protocol import to_int16
+from worker_pool import WorkerPool, default_threads_per_worker
+
+# Whitespace after sentence-final punctuation (and any closing quotes/brackets)
+# Plain-text chapter headings such as "Chapter 12" or "CHAPTER IV. The Storm"
+_CHAPTER_HEADING = re.compile(r"^\s*(chapter|part|book)\s+([0-9]+|[ivxlcdm]+)\b.*$", re.IGNORECASE | re.MULTILINE)
+# Paragraph breaks: every line of EPUB text is a block, plain text wraps paragraphs over several lines
+_LINE_BREAK = re.compile(r"\n")
+_BLANK_LINE = re.compile(r"\n\s*\n")
+
+_MANIFEST_VERSION = 1
+
+
+def read_text_book(path: Path) -> list:
+    """Split a plain-text book into (title, text) chapters at heading lines."""
+    text = path.read_text(encoding="utf-8", errors="replace")
+    headings = list(_CHAPTER_HEADING.finditer(text))
+    if not headings:
+        return [(path.stem, text)]
+
+    chapters = []
+    if text[:headings[0].start()].strip():
+        chapters.append(("Front matter", text[:headings[0].start()]))
+    for heading, following in zip(headings, headings[1:] + [None]):
+        end = following.start() if following is not None else len(text)
+        chapters.append((heading.group(0).strip(), text[heading.end():end]))
+    return chapters
+
+
+class _XHTMLText(HTMLParser):
+    """Collects the readable text of an XHTML document, one line per block."""
+
+    _BLOCKS = {"p", "div", "br", "li", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "tr", "section"}
+    _SKIP = {"script", "style", "head"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.title = None
+        self._skipping = 0
+        self._heading = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skipping += 1
+        elif tag in self._BLOCKS:
+            self.parts.append("\n")
+        if tag in ("h1", "h2", "h3") and self.title is None:
+            self._heading = []
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self._skipping = max(self._skipping - 1, 0)
+        elif tag in self._BLOCKS:
+            self.parts.append("\n")
+        if tag in ("h1", "h2", "h3") and self._heading is not None:
+            self.title = " ".join("".join(self._heading).split()) or None
+            self._heading = None
+
+    def handle_data(self, data):
+        if self._skipping:
+            return
+        self.parts.append(data)
+        if self._heading is not None:
+            self._heading.append(data)
+
+    def text(self) -> str:
+        lines = (" ".join(line.split()) for line in "".join(self.parts).splitlines())
+        return "\n".join(line for line in lines if line)
+
+
+def read_epub_book(path: Path) -> list:
+    """Read the spine documents of an EPUB as (title, text) chapters."""
+    with zipfile.ZipFile(path) as epub:
+        container = ET.fromstring(epub.read("META-INF/container.xml"))
+        rootfile = container.find(".//{*}rootfile").get("full-path")
+        opf = ET.fromstring(epub.read(rootfile))
+        base = os.path.dirname(rootfile)
+
+        manifest = {item.get("id"): item.get("href") for item in opf.find("{*}manifest")}
+        chapters = []
+        for itemref in opf.find("{*}spine"):
+            href = manifest.get(itemref.get("idref"))
+            if href is None:
+                continue
+            name = os.path.normpath(os.path.join(base, href)).replace(os.sep, "/")
+            parser = _XHTMLText()
+            parser.feed(epub.read(name).decode("utf-8", errors="replace"))
+            text = parser.text()
+            if text.strip():
+                chapters.append((parser.title or Path(href).stem, text))
+        return chapters
+
+
+def read_book(path: Path) -> list:
+    if path.suffix.lower() == ".epub":
+        return read_epub_book(path)
+    return read_text_book(path)
+
+
+def paragraph_break(path: Path) -> re.Pattern:
+    """How paragraphs are separated in the chapter text read_book returns for path."""
+    return _LINE_BREAK if path.suffix.lower() == ".epub" else _BLANK_LINE
+
+
+def split_sentences(text: str, max_chars: int, paragraph_break: re.Pattern = _LINE_BREAK) -> list:
+    """
+    Split chapter text into (sentence, start, end) with offsets into text.
+
+    Paragraph breaks always end a sentence; line breaks inside a paragraph
+    are joined as spaces. Sentences longer than max_chars are split further
+    at clause boundaries.
+    """
+    segments = []
+    position = 0
+    for paragraph in paragraph_break.split(text):
+        for piece in pack_sentences(" ".join(paragraph.split()), max_chars):
+            # Whitespace inside the piece was normalized; match any run of it in text
+            pattern = r"\s+".join(re.escape(word) for word in piece.split())
+            match = re.compile(pattern).search(text, position)
+            start = match.start() if match else position
+            end = match.end() if match else start + len(piece)
+            segments.append((piece, start, end))
+            position = end
+    return segments
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+class Progress:
+    """
+    RTF and ETA from the compute time and audio produced so far.
+
+    The ETA is the measured RTF times the audio still to come, estimated from
+    the audio produced per character so far.
+    """
+
+    def __init__(self, total_chars: int):
+        self.total_chars = total_chars
+        self.done_chars = 0
+        self.compute_s = 0.0
+        self.audio_s = 0.0
+
+    def update(self, chars: int, compute_s: float, audio_s: float):
+        self.done_chars += chars
+        self.compute_s += compute_s
+        self.audio_s += audio_s
+
+    def line(self, chapter_label: str) -> str:
+        percent = 100.0 * self.done_chars / self.total_chars if self.total_chars else 100.0
+        rtf = self.compute_s / self.audio_s if self.audio_s else float("nan")
+        eta = (self.total_chars - self.done_chars) * self.compute_s / self.done_chars if self.done_chars else None
+        return (
+            f"{chapter_label}: {percent:5.1f}% of new text, RTF {rtf:.3f}, "
+            f"audio {format_duration(self.audio_s)}, ETA {format_duration(eta) if eta is not None else '?'}"
+        )
+
+
+class BookRenderer:
+    """
+    Renders chapters through a Qwen3TTS instance or a WorkerPool.
+
+    Args:
+        engine: Anything with synthesize_batch(texts, speeds, temperature)
+        store: SegmentStore holding rendered sentences (the resume state)
+        key_params: Generation parameters that go into every segment key
+    """
+
+    def __init__(self, engine, store: SegmentStore, key_params: dict, speed: float, temperature: float,
+                 batch_size: int, pause_s: float):
+        self.engine = engine
+        self.store = store
+        self.key_params = key_params
+        self.speed = speed
+        self.temperature = temperature
+        self.batch_size = batch_size
+        self.pause_s = pause_s
+
+    def segment_key(self, text: str) -> str:
+        return cache_key(text, speed=self.speed, temperature=self.temperature, **self.key_params)
+
+    def missing(self, segments: list) -> list:
+        return [text for text, _, _ in segments if not self.store.contains(self.segment_key(text))]
+
+    def synthesize_missing(self, texts: list, progress: Progress, label: str):
+        """Synthesize texts not yet in the store, storing each batch as it completes."""
+        for offset in range(0, len(texts), self.batch_size):
+            batch = texts[offset:offset + self.batch_size]
+            start = time.perf_counter()
+            results = self.engine.synthesize_batch(batch, [self.speed] * len(batch), self.temperature)
+            elapsed = time.perf_counter() - start
+
+            audio_s = 0.0
+            for text, (audio, sample_rate) in zip(batch, results):
+                self.store.put(self.segment_key(text), audio, sample_rate)
+                audio_s += audio.shape[0] / sample_rate
+            progress.update(sum(len(text) for text in batch), elapsed, audio_s)
+            print(progress.line(label), file=sys.stderr, flush=True)
+
+    def write_chapter(self, out_dir: Path, number: int, title: str, text: str, segments: list) -> dict:
+        """Assemble the chapter WAV from stored segments and write its manifest."""
+        stem = f"chapter_{number:03d}"
+        wav_path = out_dir / f"{stem}.wav"
+        entries = []
+        sample_rate = None
+        position = 0
+
+        with atomic_write(wav_path, suffix=".wav.tmp") as f, wave.open(f, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            for index, (sentence, start, end) in enumerate(segments):
+                audio, rate = self.store.get(self.segment_key(sentence))
+                if sample_rate is None:
+                    sample_rate = rate
+                    wav_file.setframerate(rate)
+                samples = to_int16(audio)
+                pause = np.zeros(int(self.pause_s * rate), dtype=np.int16)
+                wav_file.writeframes(samples.tobytes() + pause.tobytes())
+                entries.append({
+                    "index": index,
+                    "text": sentence,
+                    "char_start": start,
+                    "char_end": end,
+                    "start_sample": position,
+                    "end_sample": position + samples.shape[0],
+                    "start_s": round(position / rate, 3),
+                    "end_s": round((position + samples.shape[0]) / rate, 3),
+                })
+                position += samples.shape[0] + pause.shape[0]
+
+        manifest = {
+            "version": _MANIFEST_VERSION,
+            "title": title,
+            "audio": wav_path.name,
+            "sample_rate": sample_rate,
+            "duration_s": round(position / sample_rate, 3) if sample_rate else 0.0,
+            "text_sha256": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+            "render_key": self.chapter_key(segments),
+            "segments": entries,
+        }
+        write_json(out_dir / f"{stem}.json", manifest)
+        return manifest
+
+    def chapter_key(self, segments: list) -> str:
+        """Identifies the exact audio a chapter manifest was built from."""
+        digest = hashlib.sha256()
+        for sentence, _, _ in segments:
+            digest.update(self.segment_key(sentence).encode("ascii"))
+        digest.update(str(self.pause_s).encode("ascii"))
+        return digest.hexdigest()
+
+
+def write_json(path: Path, data: dict):
+    """Write JSON atomically so a crash never leaves a half-written manifest."""
+    with atomic_write(path, "w", suffix=".json.tmp", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def chapter_is_complete(out_dir: Path, number: int, render_key: str) -> bool:
+    stem = f"chapter_{number:03d}"
+    try:
+        manifest = json.loads((out_dir / f"{stem}.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return False
+    return manifest.get("render_key") == render_key and (out_dir / manifest.get("audio", "")).exists()
+
+
+def default_workers(model_size: str) -> int:
+    """
+    One model process per 4 cores on CPU.
+
+    On CUDA every worker would load its own copy of the model onto the GPU,
+    so a single process is used there.
+    """
+    if model_size != "stub":
+        try:
+            import torch
+        except ImportError:
+            torch = None
+        if torch is not None and torch.cuda.is_available():
+            return 1
+    return max((os.cpu_count() or 1) // 4, 1)
+
+
+def create_engine(args):
+    """A WorkerPool when more than one worker is requested, else an in-process Qwen3TTS."""
+    options = {
+        "model_size": args.model_size,
+        "cpu_precision": args.cpu_precision,
+        "stub_rtf": args.stub_rtf,
+        "speaker": args.speaker,
+        "warmup": True,
+    }
+    if args.workers > 1:
+        pool = WorkerPool(args.workers, args.threads_per_worker, cancelled_error=GenerationCancelled)
+        info = pool.init_model(**options)
+        print(f"Started {pool.size} workers x {pool.threads_per_worker} threads on {info['device']}",
+              file=sys.stderr, flush=True)
+        return pool, info
+
+    tts = Qwen3TTS()
+    device = tts.init_model(**options)
+    print(f"Model loaded on {device}", file=sys.stderr, flush=True)
+    return tts, {
+        "model_id": tts.model_id,
+        "precision": tts.precision,
+        "speaker": tts.speaker,
+        "sample_rate": tts.sample_rate,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("book", type=Path, help="Plain-text (.txt) or EPUB (.epub) file")
+    parser.add_argument("--out-dir", type=Path, required=True)
+    parser.add_argument("--model-size", default=None, help='e.g. "0.6B", "1.7B" or "stub"')
+    parser.add_argument("--cpu-precision", default="fp32", choices=("fp32", "int8", "bf16"))
+    parser.add_argument("--stub-rtf", type=float, default=0.0, help=argparse.SUPPRESS)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Model processes (default: one per 4 cores, or 1 on a GPU)")
+    parser.add_argument("--threads-per-worker", type=int, default=None, help="Default: cores / workers")
+    parser.add_argument("--batch-size", type=int, default=None, help="Sentences per batch (default: 2 per worker)")
+    parser.add_argument("--speaker", default=None, help='e.g. "Ryan" (the default) or "Vivian"')
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--temperature", type=float, default=0.1)
+    parser.add_argument("--max-chars", type=int, default=300, help="Longer sentences are split at clauses")
+    parser.add_argument("--pause-ms", type=int, default=250, help="Silence after every sentence")
+    args = parser.parse_args()
+    if args.workers is None:
+        args.workers = default_workers(args.model_size)
+
+    chapters = read_book(args.book)
+    if not chapters:
+        sys.exit(f"No text found in {args.book}")
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    # Unbounded: the store is the resume state, not a cache
+    store = SegmentStore(args.out_dir / "segments", max_bytes=None)
+
+    engine, info = create_engine(args)
+    try:
+        threads = args.threads_per_worker or default_threads_per_worker(args.workers)
+        renderer = BookRenderer(
+            engine,
+            store,
+            {
+                "model": info["model_id"],
+                "precision": info["precision"],
+                "speaker": info["speaker"],
+                "sample_rate": info["sample_rate"],
+            },
+            args.speed,
+            args.temperature,
+            args.batch_size or 2 * max(args.workers, 1),
+            args.pause_ms / 1000,
+        )
+
+        plan = []
+        for number, (title, text) in enumerate(chapters, start=1):
+            segments = split_sentences(text, args.max_chars, paragraph_break(args.book))
+            done = chapter_is_complete(args.out_dir, number, renderer.chapter_key(segments))
+            plan.append((number, title, text, segments, [] if done else renderer.missing(segments), done))
+
+        progress = Progress(sum(len(text) for *_, missing, _ in plan for text in missing))
+        print(f"{len(chapters)} chapters, {sum(len(p[3]) for p in plan)} sentences, "
+              f"{progress.total_chars} characters left to synthesize ({args.workers} x {threads} threads)",
+              file=sys.stderr, flush=True)
+
+        book = []
+        for number, title, text, segments, missing, done in plan:
+            label = f"[{number}/{len(chapters)}] {title[:40]}"
+            if not done:
+                renderer.synthesize_missing(missing, progress, label)
+                manifest = renderer.write_chapter(args.out_dir, number, title, text, segments)
+                print(f"{label}: wrote {manifest['audio']} ({format_duration(manifest['duration_s'])})",
+                      file=sys.stderr, flush=True)
+            book.append({"number": number, "title": title, "manifest": f"chapter_{number:03d}.json"})
+
+        write_json(args.out_dir / "manifest.json", {
+            "version": _MANIFEST_VERSION,
+            "source": args.book.name,
+            "model_id": info["model_id"],
+            "speaker": info["speaker"],
+            "chapters": book,
+        })
+        print(json.dumps({
+            "chapters": len(book),
+            "synthesized_chars": progress.done_chars,
+            "audio_s": round(progress.audio_s, 1),
+            "rtf": round(progress.compute_s / progress.audio_s, 4) if progress.audio_s else None,
+        }))
+    finally:
+        if isinstance(engine, WorkerPool):
+            engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Packed, memory-mapped store for audio segments.
+
+A drop-in alternative to AudioCache (same get/put/contains/stats interface)
+that keeps every segment in one append-only file instead of one file each:
+
+- data-<gen>.pcm: 16-bit little-endian mono PCM of all segments, back to back
+- index-<gen>.idx: fixed-size entries (SHA-256 of the key, byte offset,
+  sample count, sample rate), appended after the segment's data
+- CURRENT: the generation number of the live data/index pair
+
+Reads go through an mmap of the data file: get() returns a read-only numpy
+view into the mapping, so a cache hit is written to the response without
+being copied (pcm_s16le needs no conversion at all). Segments are stored as
+int16 because that is what the WAV and pcm_s16le encodings send anyway.
+
+Concurrency: writers take an exclusive lock on a lock file, append the data,
+then append the index entry, so readers (other threads or processes) never
+see an entry whose data is incomplete; a torn index entry left by a crash is
+ignored. Readers pick up other processes' appends by re-reading the index tail
+on a miss. Compaction writes the kept segments into a new generation and then
+switches CURRENT atomically; readers move to it on their next miss, and views
+handed out earlier stay valid because they keep the old mapping alive.
+
+When the live data exceeds max_bytes the store compacts itself, keeping the
+most recently used segments (recency is tracked per process) down to 80% of
+the budget.
+"""
+
+import contextlib
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from fsutil import atomic_write
+from tts_protocol import to_int16
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# digest, byte offset, sample count, sample rate
+_ENTRY = struct.Struct("<32sQII")
+_SAMPLE = np.dtype("<i2")
+
+
+def _digest(key: str) -> bytes:
+    return hashlib.sha256(key.encode("utf-8")).digest()
+
+
+@contextlib.contextmanager
+def _file_lock(path: Path):
+    """Exclusive inter-process lock held for the duration of the block."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class SegmentStore:
+    """
+    Args:
+        directory: Where the store lives (created if missing)
+        max_bytes: Budget for live segment data; None for no limit
+    """
+
+    def __init__(self, directory, max_bytes: int = 500 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._lock_path = self.directory / "store.lock"
+
+        self._generation = None
+        self._entries = OrderedDict()  # digest -> (offset, samples, sample_rate), LRU order
+        self._index_pos = 0
+        self._live_bytes = 0
+        self._map = None
+        self._refresh()
+
+    def _paths(self, generation: int):
+        return (
+            self.directory / f"data-{generation}.pcm",
+            self.directory / f"index-{generation}.idx",
+        )
+
+    def _current_generation(self) -> int:
+        try:
+            return int((self.directory / "CURRENT").read_text().strip())
+        except (OSError, ValueError):
+            return 0
+
+    def _refresh(self):
+        """Follow a generation switch and load index entries appended since the last look (lock held)."""
+        generation = self._current_generation()
+        if generation != self._generation:
+            self._generation = generation
+            self._entries = OrderedDict()
+            self._index_pos = 0
+            self._live_bytes = 0
+            self._map = None
+
+        _, index_path = self._paths(self._generation)
+        try:
+            with open(index_path, "rb") as f:
+                f.seek(self._index_pos)
+                tail = f.read()
+        except FileNotFoundError:
+            return
+
+        # A torn entry at the end (crash mid-append) is left for later
+        usable = len(tail) - len(tail) % _ENTRY.size
+        for start in range(0, usable, _ENTRY.size):
+            digest, offset, samples, sample_rate = _ENTRY.unpack_from(tail, start)
+            if digest not in self._entries:
+                self._live_bytes += samples * _SAMPLE.itemsize
+            self._entries[digest] = (offset, samples, sample_rate)
+        self._index_pos += usable
+
+    def _view(self, offset: int, samples: int) -> np.ndarray:
+        """Read-only view of a segment, remapping the data file if it has grown (lock held)."""
+        end = offset + samples * _SAMPLE.itemsize
+        if self._map is None or len(self._map) < end:
+            data_path, _ = self._paths(self._generation)
+            with open(data_path, "rb") as f:
+                # Earlier views keep the previous mapping alive; it is not closed here
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return np.frombuffer(self._map, dtype=_SAMPLE, count=samples, offset=offset)
+
+    def contains(self, key: str) -> bool:
+        """Whether a segment exists, without reading it or counting a hit."""
+        digest = _digest(key)
+        with self._lock:
+            if digest not in self._entries:
+                self._refresh()
+            return digest in self._entries
+
+    def get(self, key: str):
+        """
+        Look up a segment.
+
+        Returns:
+            tuple: (int16 audio view, sample_rate) on a hit, None on a miss
+        """
+        digest = _digest(key)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self._refresh()
+                entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            try:
+                audio = self._view(*entry[:2])
+            except (OSError, ValueError):
+                # Stale entry from a generation another process compacted away
+                self._refresh()
+                entry = self._entries.get(digest)
+                try:
+                    audio = self._view(*entry[:2]) if entry is not None else None
+                except (OSError, ValueError):
+                    audio = None
+                if audio is None:
+                    self.misses += 1
+                    return None
+            sample_rate = entry[2]
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return audio, sample_rate
+
+    def put(self, key: str, audio: np.ndarray, sample_rate: int):
+        """Append a segment (a no-op if the key is already stored), compacting if over budget."""
+        digest = _digest(key)
+        pcm = np.ascontiguousarray(to_int16(audio), dtype=_SAMPLE)
+
+        with self._lock, _file_lock(self._lock_path):
+            self._refresh()
+            if digest in self._entries:
+                # Keys are content addresses, so the stored audio is the same
+                self._entries.move_to_end(digest)
+                return
+
+            data_path, index_path = self._paths(self._generation)
+            with open(data_path, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(memoryview(pcm).cast("B"))
+            with open(index_path, "ab") as f:
+                f.write(_ENTRY.pack(digest, offset, pcm.shape[0], sample_rate))
+            self._index_pos += _ENTRY.size
+            self._entries[digest] = (offset, pcm.shape[0], sample_rate)
+            self._live_bytes += pcm.nbytes
+
+            if self.max_bytes is not None and self._live_bytes > self.max_bytes:
+                self._compact(int(self.max_bytes * 0.8))
+
+    def compact(self) -> dict:
+        """Rewrite the store without dead space (and within budget)."""
+        with self._lock, _file_lock(self._lock_path):
+            self._refresh()
+            return self._compact(self.max_bytes)
+
+    def _compact(self, target_bytes) -> dict:
+        """Write the most recently used segments into a new generation (both locks held)."""
+        before = self._data_size()
+        kept = []
+        total = 0
+        for digest, (offset, samples, sample_rate) in reversed(self._entries.items()):
+            size = samples * _SAMPLE.itemsize
+            if target_bytes is not None and total + size > target_bytes:
+                continue
+            kept.append((digest, offset, samples, sample_rate))
+            total += size
+        kept.reverse()
+
+        old_generation = self._generation
+        generation = old_generation + 1
+        data_path, index_path = self._paths(generation)
+        entries = OrderedDict()
+        with open(data_path, "wb") as data, open(index_path, "wb") as index:
+            for digest, offset, samples, sample_rate in kept:
+                new_offset = data.tell()
+                data.write(memoryview(self._view(offset, samples)).cast("B"))
+                index.write(_ENTRY.pack(digest, new_offset, samples, sample_rate))
+                entries[digest] = (new_offset, samples, sample_rate)
+            data.flush()
+            os.fsync(data.fileno())
+            index.flush()
+            os.fsync(index.fileno())
+
+        with atomic_write(self.directory / "CURRENT", "w") as f:
+            f.write(str(generation))
+
+        dropped = len(self._entries) - len(entries)
+        self._generation = generation
+        self._entries = entries
+        self._index_pos = len(entries) * _ENTRY.size
+        self._live_bytes = total
+        self._map = None
+
+        # Readers elsewhere may still map the old files; on Windows they cannot
+        # be deleted yet and are retried on the next compaction
+        for path in self.directory.iterdir():
+            if path.suffix in (".pcm", ".idx") and path not in (data_path, index_path):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+        return {"kept": len(entries), "dropped": dropped, "bytes_before": before, "bytes_after": total}
+
+    def _data_size(self) -> int:
+        try:
+            return self._paths(self._generation)[0].stat().st_size
+        except OSError:
+            return 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "format": "packed",
+                "entries": len(self._entries),
+                "bytes": self._live_bytes,
+                "file_bytes": self._data_size(),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,198 @@
+"""
+Adaptive text segmentation for streamed playback.
+
+The app plays a long text chunk by chunk: the first chunk decides how soon
+audio starts, and every later chunk has to be synthesized while the audio
+before it plays. A fixed character budget cannot get both right, because the
+right sizes depend on how fast the model runs on this machine.
+
+LatencyModel learns that online: every generate reports how many characters
+it synthesized, how long the model call took and how much audio it produced,
+and the model keeps an exponentially weighted least-squares fit of
+
+    latency = overhead + seconds_per_char * chars
+
+plus the audio seconds produced per character. Segmenter.plan() then splits a
+text at sentence and clause boundaries only: the first chunk is the largest
+that is predicted to be ready within the first-audio target, and each later
+chunk is the largest that is predicted to be ready before the audio already
+planned finishes playing (with a safety margin), up to max_chars. When the
+model runs faster than real time the chunks grow, which keeps per-call
+overhead low; when it does not, chunks stay small and the plan reports the
+predicted stalls.
+"""
+
+import re
+import threading
+
+# Used until the first measurements arrive (roughly the 0.6B model on a laptop CPU)
+PRIOR_OVERHEAD_S = 0.1
+PRIOR_SECONDS_PER_CHAR = 0.02
+PRIOR_AUDIO_S_PER_CHAR = 0.065
+
+# Clause boundaries: whitespace after sentence or clause punctuation, optionally
+# followed by a closing quote or bracket
+_BOUNDARY = re.compile(
+    r"(?:(?<=[.!?;:,\u2014\u2026])|(?<=[.!?;:,\u2014\u2026][\"'\u201d\u2019)\]]))\s+"
+)
+_SENTENCE_END = re.compile(r"[.!?\u2026][\"'\u201d\u2019)\]]*$")
+
+
+def split_units(text: str) -> list:
+    """Clauses of text, each as (clause, ends_sentence)."""
+    return [
+        (clause, bool(_SENTENCE_END.search(clause)))
+        for clause in _BOUNDARY.split(text.strip())
+        if clause
+    ]
+
+
+def pack_sentences(text: str, max_chars: int) -> list:
+    """
+    Sentences of text, with sentences longer than max_chars packed into
+    clause groups of at most max_chars. A single longer clause stays whole.
+    """
+    pieces = []
+    current = ""
+    for clause, ends_sentence in split_units(text):
+        if current and len(current) + 1 + len(clause) > max_chars:
+            pieces.append(current)
+            current = clause
+        else:
+            current = f"{current} {clause}" if current else clause
+        if ends_sentence:
+            pieces.append(current)
+            current = ""
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class LatencyModel:
+    """
+    Online fit of model latency and audio length against text length.
+
+    Args:
+        decay: Weight kept by older observations at every new one
+    """
+
+    def __init__(self, decay: float = 0.9):
+        self.decay = decay
+        self.samples = 0
+        self._lock = threading.Lock()
+        # Decayed sums for the least-squares fit of latency over chars
+        self._w = self._x = self._y = self._xx = self._xy = 0.0
+        # Decayed sums for audio seconds (at speed 1.0) per char
+        self._chars = self._audio = 0.0
+
+    def observe(self, chars: int, elapsed_s: float, audio_s: float):
+        """Record one model call: characters, wall time and audio (normalized to speed 1.0)."""
+        if chars <= 0 or elapsed_s <= 0:
+            return
+        with self._lock:
+            d = self.decay
+            self._w = self._w * d + 1.0
+            self._x = self._x * d + chars
+            self._y = self._y * d + elapsed_s
+            self._xx = self._xx * d + chars * chars
+            self._xy = self._xy * d + chars * elapsed_s
+            self._chars = self._chars * d + chars
+            self._audio = self._audio * d + audio_s
+            self.samples += 1
+
+    def coefficients(self) -> tuple:
+        """(overhead_s, seconds_per_char, audio_s_per_char), from priors until measured."""
+        with self._lock:
+            if self.samples == 0:
+                return PRIOR_OVERHEAD_S, PRIOR_SECONDS_PER_CHAR, PRIOR_AUDIO_S_PER_CHAR
+            audio_per_char = self._audio / self._chars if self._audio > 0 else PRIOR_AUDIO_S_PER_CHAR
+
+            mean_x = self._x / self._w
+            mean_y = self._y / self._w
+            variance = self._xx / self._w - mean_x * mean_x
+            # Lengths that barely vary cannot separate overhead from per-char cost
+            if self.samples >= 3 and variance > 100.0:
+                slope = (self._xy / self._w - mean_x * mean_y) / variance
+                intercept = mean_y - slope * mean_x
+                if slope > 0 and intercept >= 0:
+                    return intercept, slope, audio_per_char
+            return 0.0, self._y / self._x, audio_per_char
+
+    def describe(self) -> dict:
+        overhead, per_char, audio_per_char = self.coefficients()
+        return {
+            "samples": self.samples,
+            "overhead_ms": round(overhead * 1000, 2),
+            "ms_per_char": round(per_char * 1000, 3),
+            "audio_ms_per_char": round(audio_per_char * 1000, 2),
+            "rtf": round(per_char / audio_per_char, 4) if audio_per_char else None,
+        }
+
+
+class Segmenter:
+    """
+    Plans chunk boundaries from a LatencyModel.
+
+    Args:
+        model: The latency model fed by generate timings
+        safety: Fraction of the remaining playback time a later chunk may use
+    """
+
+    def __init__(self, model: LatencyModel = None, safety: float = 0.8):
+        self.model = model or LatencyModel()
+        self.safety = safety
+
+    def plan(self, text: str, first_latency_s: float = 0.5, max_chars: int = 300, speed: float = 1.0) -> dict:
+        """
+        Split text into chunks for streamed synthesis.
+
+        Returns:
+            dict: "chunks" (strings, in order), "predicted" (per chunk: chars,
+            latency_ms, audio_s, stall_ms) and "first_audio_ms"
+        """
+        units = split_units(text)
+        overhead, per_char, audio_per_char = self.model.coefficients()
+        speed = speed or 1.0
+
+        chunks, predicted = [], []
+        synth_end = 0.0     # when the chunks planned so far are synthesized
+        play_end = 0.0      # when their audio has finished playing
+        start = 0
+        while start < len(units):
+            budget = first_latency_s if not chunks else self.safety * (play_end - synth_end)
+            end, sentence_end = start + 1, None
+            chars = -1
+            for index in range(start, len(units)):
+                chars += len(units[index][0]) + 1
+                if index > start and (chars > max_chars or overhead + per_char * chars > budget):
+                    break
+                end = index + 1
+                if units[index][1]:
+                    sentence_end = (end, chars)
+
+            chunk_chars = sum(len(clause) + 1 for clause, _ in units[start:end]) - 1
+            # Prefer ending on a sentence unless that gives up more than half the chunk
+            if sentence_end is not None and sentence_end[0] != end and sentence_end[1] * 2 >= chunk_chars:
+                end, chunk_chars = sentence_end
+
+            chunk = " ".join(clause for clause, _ in units[start:end])
+            latency = overhead + per_char * len(chunk)
+            audio = audio_per_char * len(chunk) / speed
+            synth_end += latency
+            stall = max(synth_end - play_end, 0.0) if chunks else 0.0
+            play_end = max(play_end, synth_end) + audio
+
+            chunks.append(chunk)
+            predicted.append({
+                "chars": len(chunk),
+                "latency_ms": round(latency * 1000, 1),
+                "audio_s": round(audio, 3),
+                "stall_ms": round(stall * 1000, 1),
+            })
+            start = end
+
+        return {
+            "chunks": chunks,
+            "predicted": predicted,
+            "first_audio_ms": predicted[0]["latency_ms"] if predicted else 0.0,
+        }
@@ -0,0 +1,189 @@
+"""
+Cumulative metrics for the TTS sidecar, reported by the "stats" action.
+
+Counters are plain integers keyed by action name; distributions are kept in
+fixed, log-spaced histograms so memory use never grows with the number of
+requests, no matter how long the sidecar runs. Percentiles are read from the
+histograms, so they are accurate to one bucket (about 19% with the default
+four buckets per doubling).
+"""
+
+import bisect
+import math
+import sys
+import threading
+import time
+
+
+class Histogram:
+    """
+    Fixed-size histogram with geometrically spaced buckets.
+
+    Args:
+        low: Upper bound of the first bucket; smaller values land in it
+        high: Values above the last bound land in a final overflow bucket
+        per_doubling: Buckets per factor of two
+    """
+
+    def __init__(self, low: float, high: float, per_doubling: int = 4):
+        count = math.ceil(math.log2(high / low) * per_doubling) + 1
+        self.bounds = [low * 2 ** (i / per_doubling) for i in range(count)]
+        self.counts = [0] * (count + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def record(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (0-100)."""
+        if not self.total:
+            return None
+        rank = max(math.ceil(self.total * q / 100), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                bound = self.bounds[index] if index < len(self.bounds) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self, digits: int = 3) -> dict:
+        if not self.total:
+            return {"count": 0}
+        return {
+            "count": self.total,
+            "mean": round(self.sum / self.total, digits),
+            "min": round(self.min, digits),
+            "max": round(self.max, digits),
+            "p50": round(self.percentile(50), digits),
+            "p90": round(self.percentile(90), digits),
+            "p99": round(self.percentile(99), digits),
+            # Non-empty buckets as [upper bound, count]; the overflow bucket has bound null
+            "buckets": [
+                [round(self.bounds[i], digits) if i < len(self.bounds) else None, count]
+                for i, count in enumerate(self.counts) if count
+            ],
+        }
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process, or None if unavailable."""
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class _Counters(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = _Counters()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return None
+            return int(counters.PeakWorkingSetSize)
+        except (AttributeError, OSError):
+            return None
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def torch_allocator_stats(torch) -> dict:
+    """CUDA caching allocator figures, or None without torch or a GPU."""
+    if torch is None or not torch.cuda.is_available():
+        return None
+    stats = torch.cuda.memory_stats()
+    mb = 1024 * 1024
+    return {
+        "allocated_mb": round(stats.get("allocated_bytes.all.current", 0) / mb, 1),
+        "allocated_peak_mb": round(stats.get("allocated_bytes.all.peak", 0) / mb, 1),
+        "reserved_mb": round(stats.get("reserved_bytes.all.current", 0) / mb, 1),
+        "reserved_peak_mb": round(stats.get("reserved_bytes.all.peak", 0) / mb, 1),
+        "alloc_retries": stats.get("num_alloc_retries", 0),
+        "ooms": stats.get("num_ooms", 0),
+    }
+
+
+class SidecarStats:
+    """
+    Thread-safe counters and histograms for one sidecar process.
+
+    Requests are counted on the reader thread and results on the worker
+    thread, so every update takes a lock.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.errors = {}
+        self.cancelled = 0
+        self.characters = 0
+        self.audio_seconds = 0.0
+        # End-to-end generate latency (command read to final response sent)
+        self.latency_ms = Histogram(1.0, 120_000.0)
+        # Compute seconds per audio second for each model call
+        self.rtf = Histogram(0.01, 20.0)
+
+    def record_request(self, action):
+        with self._lock:
+            self.requests[action] = self.requests.get(action, 0) + 1
+
+    def record_response(self, action, status: str):
+        with self._lock:
+            if status == "error":
+                self.errors[action] = self.errors.get(action, 0) + 1
+            elif status == "cancelled":
+                self.cancelled += 1
+
+    def record_latency(self, seconds: float):
+        with self._lock:
+            self.latency_ms.record(seconds * 1000)
+
+    def record_audio(self, characters: int, audio_seconds: float):
+        with self._lock:
+            self.characters += characters
+            self.audio_seconds += audio_seconds
+
+    def record_rtf(self, compute_seconds: float, audio_seconds: float):
+        if audio_seconds <= 0:
+            return
+        with self._lock:
+            self.rtf.record(compute_seconds / audio_seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "uptime_s": round(time.time() - self.started, 1),
+                "requests": dict(self.requests),
+                "errors": dict(self.errors),
+                "cancelled": self.cancelled,
+                "characters": self.characters,
+                "audio_seconds": round(self.audio_seconds, 2),
+                "latency_ms": self.latency_ms.summary(1),
+                "rtf": self.rtf.summary(4),
+            }
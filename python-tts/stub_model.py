@@ -0,0 +1,67 @@
+"""
+Weight-free stand-in for Qwen3TTSModel.
+
+Selected with {"action": "init", "model_size": "stub"}. It implements the
+same generate_custom_voice() interface but returns a sine tone whose length
+follows the text (~50 ms per character, like the pre-init placeholder) and
+whose pitch depends on the speaker. It can also simulate compute time at a
+given real-time factor, so benchmarks and protocol tests can run on a
+CPU-only machine without torch or model weights.
+"""
+
+import time
+
+import numpy as np
+
+STUB_MODEL_ID = "stub"
+
+# Simulated codec frame rate (the real model decodes 12 frames per second)
+_FRAMES_PER_SECOND = 12
+
+# Same names as the CustomVoice checkpoints' built-in speakers
+SPEAKERS = ("Vivian", "Serena", "Uncle_Fu", "Dylan", "Eric", "Ryan", "Aiden", "Ono_Anna", "Sohee")
+
+
+class StubModel:
+    """
+    Args:
+        sample_rate: Sample rate of the generated audio
+        rtf: Simulated real-time factor (compute seconds per audio second)
+        on_step: Called before every simulated decode step, like a forward
+            pre-hook on the real model (used for cancellation)
+    """
+
+    def __init__(self, sample_rate: int = 12000, rtf: float = 0.0, on_step=None):
+        self.sample_rate = sample_rate
+        self.rtf = rtf
+        self.on_step = on_step
+
+    def get_supported_speakers(self) -> list:
+        return list(SPEAKERS)
+
+    @staticmethod
+    def _frequency(speaker: str) -> float:
+        """Tone frequency standing in for the speaker's voice."""
+        if speaker not in SPEAKERS:
+            raise ValueError(f"Unknown speaker: {speaker}")
+        return 165.0 + 15.0 * SPEAKERS.index(speaker)
+
+    def _tone(self, text: str, frequency: float) -> np.ndarray:
+        duration = len(text) * 0.05  # ~50ms per character
+        frames = max(int(duration * _FRAMES_PER_SECOND), 1)
+        step = duration * self.rtf / frames
+
+        for _ in range(frames):
+            if self.on_step is not None:
+                self.on_step()
+            if step:
+                time.sleep(step)
+
+        t = np.arange(int(self.sample_rate * duration), dtype=np.float32) / self.sample_rate
+        return (np.sin(2 * np.pi * frequency * t) * 0.3).astype(np.float32)
+
+    def generate_custom_voice(self, text, language=None, speaker=None, **kwargs):
+        """Same call shape as Qwen3TTSModel.generate_custom_voice."""
+        texts = text if isinstance(text, list) else [text]
+        speakers = speaker if isinstance(speaker, list) else [speaker or "Ryan"] * len(texts)
+        return [self._tone(t, self._frequency(name)) for t, name in zip(texts, speakers)], self.sample_rate
@@ -0,0 +1,77 @@
+"""
+Per-machine profile of the best torch thread configuration.
+
+Autotuning (see Qwen3TTS.autotune_threads) times a fixed utterance with a
+few intra-op thread counts and keeps the fastest. The result is stored in a
+small JSON file keyed by a machine signature (CPU, core count, torch version,
+model and precision), so later launches on the same machine reuse it without
+tuning again. Delete the file (or change any part of the signature) to
+re-tune.
+"""
+
+import json
+import os
+import platform
+from pathlib import Path
+
+from fsutil import atomic_write
+
+_VERSION = 1
+
+
+def default_profile_path() -> Path:
+    """Profile file location, overridable with KOKORO_TTS_THREAD_PROFILE."""
+    override = os.environ.get("KOKORO_TTS_THREAD_PROFILE")
+    if override:
+        return Path(override)
+    return Path.home() / ".cache" / "kokoro-reader" / "thread_profile.json"
+
+
+def machine_signature(torch_version: str, model_id: str, precision: str) -> str:
+    """Everything that can change which thread count is fastest."""
+    return "|".join([
+        platform.machine(),
+        platform.processor() or "unknown",
+        str(os.cpu_count()),
+        torch_version,
+        model_id,
+        precision,
+    ])
+
+
+def candidate_thread_counts(default: int) -> list:
+    """
+    Intra-op thread counts worth trying, largest first.
+
+    All cores but one (left for the app's audio thread), half and a quarter
+    of the cores, plus torch's own default for comparison.
+    """
+    cores = os.cpu_count() or 1
+    candidates = {max(cores - 1, 1), max(cores // 2, 1), max(cores // 4, 1), default}
+    return sorted(candidates, reverse=True)
+
+
+def _load(path: Path) -> dict:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != _VERSION:
+        return {}
+    return data.get("entries", {})
+
+
+def load_profile(signature: str, path: Path = None) -> dict:
+    """The stored configuration for this signature, or None."""
+    return _load(Path(path or default_profile_path())).get(signature)
+
+
+def save_profile(signature: str, entry: dict, path: Path = None):
+    """Store a configuration atomically, keeping other machines' entries."""
+    path = Path(path or default_profile_path())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    entries = _load(path)
+    entries[signature] = entry
+
+    with atomic_write(path, "w") as f:
+        json.dump({"version": _VERSION, "entries": entries}, f, indent=2)
@@ -0,0 +1,153 @@
+"""
+Pitch-preserving time-stretch (WSOLA) for speech, in float32 numpy.
+
+Waveform Similarity Overlap-Add cuts the input into Hann-windowed frames and
+lays them out at a fixed synthesis hop. Each frame is read from around the
+position the speed factor calls for, and shifted by up to `tolerance`
+samples to the spot that best continues the previously chosen frame. This
+means no resampling, so pitch is unchanged. The search for each frame is
+one matrix-vector product over all candidate offsets.
+
+TimeStretcher keeps the unread input, the search state and the pending
+overlap tail between calls, so it can stretch a stream chunk by chunk and
+produce the same output as a one-shot call.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Frame length and search tolerance in seconds (tuned for speech)
+FRAME_SECONDS = 0.020
+TOLERANCE_SECONDS = 0.005
+
+
+class TimeStretcher:
+    """
+    Incremental WSOLA time-stretcher.
+
+    Args:
+        speed: Playback speed (> 1 is faster/shorter, < 1 slower/longer)
+        sample_rate: Sample rate of the audio, used to size frames
+    """
+
+    def __init__(self, speed: float, sample_rate: int):
+        if speed <= 0:
+            raise ValueError(f"Speed must be positive, got {speed}")
+
+        self.speed = float(speed)
+        self.frame_length = max(int(FRAME_SECONDS * sample_rate) // 2 * 2, 16)
+        self.synthesis_hop = self.frame_length // 2
+        self.analysis_hop = self.synthesis_hop * self.speed
+        self.tolerance = max(int(TOLERANCE_SECONDS * sample_rate), 1)
+
+        # Periodic Hann: at 50% overlap the windows sum to exactly 1
+        n = np.arange(self.frame_length, dtype=np.float32)
+        self._window = (0.5 - 0.5 * np.cos(2 * np.pi * n / self.frame_length)).astype(np.float32)
+
+        # Input starts with half a frame of silence so the first frame's fade-in
+        # lands on padding; the matching output is dropped in _emit
+        self._input = np.zeros(self.synthesis_hop, dtype=np.float32)
+        self._input_offset = 0
+        self._frame = 0
+        self._previous = None
+        self._tail = np.zeros(self.frame_length - self.synthesis_hop, dtype=np.float32)
+        self._to_drop = self.synthesis_hop
+        self._consumed = 0
+        self._emitted = 0
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """Feed the next input chunk and return the output that is now final."""
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        self._consumed += chunk.shape[0]
+        if self.speed == 1.0:
+            return chunk
+
+        self._input = np.concatenate((self._input, chunk))
+        return self._emit(self._run())
+
+    def flush(self) -> np.ndarray:
+        """Process the remaining input and return the rest of the output."""
+        if self.speed == 1.0:
+            return np.zeros(0, dtype=np.float32)
+
+        # Pad with enough silence for every outstanding frame, then trim to
+        # the exact expected length
+        padding = self.frame_length + 2 * self.tolerance + int(np.ceil(self.analysis_hop)) + self.synthesis_hop
+        self._input = np.concatenate((self._input, np.zeros(padding, dtype=np.float32)))
+        output = self._emit(self._run())
+        already = self._emitted - output.shape[0]
+        output = output[:max(int(round(self._consumed / self.speed)) - already, 0)]
+        self._emitted = already + output.shape[0]
+        return output
+
+    def _run(self) -> np.ndarray:
+        """Place every frame whose input is fully available; return finished samples."""
+        frame_length = self.frame_length
+        hop = self.synthesis_hop
+        tolerance = self.tolerance
+        input_end = self._input_offset + self._input.shape[0]
+
+        # Upper bound on frames we can place with the input we have
+        frames = max(int((input_end - tolerance - frame_length) / self.analysis_hop) - self._frame + 1, 0)
+        output = np.empty(frames * hop, dtype=np.float32)
+        placed = 0
+
+        for _ in range(frames):
+            nominal = int(round(self._frame * self.analysis_hop))
+            low = max(nominal - tolerance, 0)
+            high = nominal + tolerance
+            if high + frame_length > input_end:
+                break
+            if self._previous is not None and self._previous + hop + frame_length > input_end:
+                break
+
+            if self._previous is None:
+                position = nominal
+            else:
+                # Pick the candidate most similar to the natural continuation
+                # of the previous frame
+                start = self._previous + hop - self._input_offset
+                template = self._input[start:start + frame_length]
+                region = self._input[low - self._input_offset:high - self._input_offset + frame_length]
+                scores = sliding_window_view(region, frame_length) @ template
+                position = low + int(np.argmax(scores))
+
+            segment = self._input[position - self._input_offset:position - self._input_offset + frame_length]
+            out = output[placed * hop:(placed + 1) * hop]
+            np.multiply(segment[:hop], self._window[:hop], out=out)
+            out += self._tail[:hop]
+            np.multiply(segment[hop:], self._window[hop:], out=self._tail)
+
+            self._previous = position
+            self._frame += 1
+            placed += 1
+
+        # Drop input no future frame or template can reach
+        keep_from = int(round(self._frame * self.analysis_hop)) - tolerance
+        if self._previous is not None:
+            keep_from = min(keep_from, self._previous + hop)
+        drop = min(max(keep_from - self._input_offset, 0), self._input.shape[0])
+        if drop:
+            self._input = self._input[drop:]
+            self._input_offset += drop
+
+        return output[:placed * hop]
+
+    def _emit(self, output: np.ndarray) -> np.ndarray:
+        """Strip the padding-induced lead-in and count what is handed out."""
+        if self._to_drop:
+            dropped = min(self._to_drop, output.shape[0])
+            output = output[dropped:]
+            self._to_drop -= dropped
+        self._emitted += output.shape[0]
+        return output
+
+
+def time_stretch(audio: np.ndarray, speed: float, sample_rate: int) -> np.ndarray:
+    """Change the speed of a whole clip without changing its pitch."""
+    if speed == 1.0:
+        return np.asarray(audio, dtype=np.float32)
+
+    stretcher = TimeStretcher(speed, sample_rate)
+    head = stretcher.process(audio)
+    return np.concatenate((head, stretcher.flush()))
@@ -0,0 +1,224 @@
+"""
+Wire format helpers for the TTS sidecar stdout protocol.
+
+Every message starts with a single JSON line. Audio travels in one of two ways:
+
+- "wav_base64" (default): a base64-encoded 16-bit WAV in the "audio" field of
+  the JSON line. This is what older clients expect.
+- "pcm_s16le" / "pcm_f32le": the JSON line is only a header. It is followed by
+  a 4-byte little-endian length and then exactly that many bytes of raw mono
+  PCM, written straight from the numpy buffer:
+
+      {"status": "ok", "action": "generate", "encoding": "pcm_s16le",
+       "sample_rate": 12000, "samples": 48000, "payload_bytes": 96000}\\n
+      <u32 LE 96000><96000 bytes of PCM>
+
+The server advertises the encodings it supports in its "ready" message and the
+client picks one per request with an "encoding" field.
+
+This module only depends on numpy so it can be shared with benchmarks and
+tools that never load torch.
+"""
+
+import base64
+import io
+import json
+import struct
+import time
+import wave
+
+import numpy as np
+
+ENCODING_WAV_BASE64 = "wav_base64"
+ENCODING_PCM_S16LE = "pcm_s16le"
+ENCODING_PCM_F32LE = "pcm_f32le"
+
+ENCODINGS = (ENCODING_WAV_BASE64, ENCODING_PCM_S16LE, ENCODING_PCM_F32LE)
+
+_PCM_DTYPES = {
+    ENCODING_PCM_S16LE: np.dtype("<i2"),
+    ENCODING_PCM_F32LE: np.dtype("<f4"),
+}
+
+_LENGTH_PREFIX = struct.Struct("<I")
+
+
+class Timings:
+    """
+    Per-request stopwatch.
+
+    mark(name) adds the time since the previous mark (or start()) to `name`,
+    so a sequence of marks splits a request into consecutive stages.
+    """
+
+    __slots__ = ("durations", "_last")
+
+    def __init__(self):
+        self.durations = {}
+        self._last = time.perf_counter()
+
+    def start(self):
+        self._last = time.perf_counter()
+
+    def mark(self, name: str):
+        now = time.perf_counter()
+        self.durations[name] = self.durations.get(name, 0.0) + now - self._last
+        self._last = now
+
+    def merged(self, other: "Timings") -> "Timings":
+        """A new Timings holding the stages of both (durations of shared stages add up)."""
+        combined = Timings()
+        combined.durations = dict(self.durations)
+        for name, seconds in other.durations.items():
+            combined.durations[name] = combined.durations.get(name, 0.0) + seconds
+        return combined
+
+    def as_dict(self) -> dict:
+        """Durations in milliseconds."""
+        return {name: round(seconds * 1000, 3) for name, seconds in self.durations.items()}
+
+
+class _NoTimings:
+    """Stand-in used when timings are off, so instrumented code needs no branches."""
+
+    __slots__ = ()
+
+    def start(self):
+        pass
+
+    def mark(self, name: str):
+        pass
+
+
+NO_TIMINGS = _NoTimings()
+
+
+def to_int16(audio: np.ndarray) -> np.ndarray:
+    """Convert float audio in [-1, 1] (or any integer audio) to int16."""
+    if audio.dtype == np.int16:
+        return audio
+    if audio.dtype.kind == "f":
+        audio = np.clip(audio, -1.0, 1.0)
+        return (audio * 32767).astype(np.int16)
+    return audio.astype(np.int16)
+
+
+def to_float32(audio: np.ndarray) -> np.ndarray:
+    """Convert audio to float32 in [-1, 1]."""
+    if audio.dtype == np.int16:
+        return audio.astype(np.float32) / 32768.0
+    return np.clip(audio, -1.0, 1.0).astype(np.float32, copy=False)
+
+
+def to_wav_bytes(audio: np.ndarray, sample_rate: int, timings=NO_TIMINGS) -> bytes:
+    """Convert audio array to 16-bit mono WAV bytes."""
+    audio = to_int16(audio)
+    timings.mark("int16")
+
+    wav_buffer = io.BytesIO()
+    with wave.open(wav_buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)  # Mono
+        wav_file.setsampwidth(2)  # 16-bit
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(audio.tobytes())
+
+    wav_bytes = wav_buffer.getvalue()
+    timings.mark("wav_pack")
+    return wav_bytes
+
+
+def to_pcm(audio: np.ndarray, encoding: str) -> np.ndarray:
+    """Return a C-contiguous little-endian array ready to be written as-is."""
+    dtype = _PCM_DTYPES[encoding]
+    if dtype.kind == "i":
+        audio = to_int16(audio)
+    else:
+        audio = to_float32(audio)
+    return np.ascontiguousarray(audio, dtype=dtype)
+
+
+def check_encoding(encoding: str):
+    """Raise ValueError for an encoding encode_audio() cannot produce."""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unsupported encoding: {encoding}. Supported: {', '.join(ENCODINGS)}")
+
+
+def encode_audio(audio: np.ndarray, sample_rate: int, encoding: str = ENCODING_WAV_BASE64,
+                 timings=NO_TIMINGS):
+    """
+    Encode audio for a response.
+
+    Returns:
+        tuple: (fields, payload) where fields are merged into the JSON line and
+        payload is either None or a numpy array to send as a binary frame.
+    """
+    if encoding == ENCODING_WAV_BASE64:
+        wav_bytes = to_wav_bytes(audio, sample_rate, timings)
+        audio_b64 = base64.b64encode(wav_bytes).decode('utf-8')
+        timings.mark("base64")
+        return {
+            "audio": audio_b64,
+            "sample_rate": sample_rate,
+        }, None
+
+    check_encoding(encoding)
+    pcm = to_pcm(audio, encoding)
+    timings.mark("int16" if encoding == ENCODING_PCM_S16LE else "float32")
+    return {
+        "encoding": encoding,
+        "sample_rate": sample_rate,
+        "samples": int(pcm.shape[0]),
+        "payload_bytes": int(pcm.nbytes),
+    }, pcm
+
+
+def write_message(stream, message: dict, payload=None):
+    """
+    Write one message to a binary stream and flush it.
+
+    The payload (bytes or a numpy array) is written through a memoryview so
+    numpy buffers go to the stream without an intermediate copy.
+    """
+    stream.write(json.dumps(message).encode('utf-8') + b"\n")
+    if payload is not None:
+        view = memoryview(payload).cast("B")
+        stream.write(_LENGTH_PREFIX.pack(view.nbytes))
+        stream.write(view)
+    stream.flush()
+
+
+def _read_exact(stream, size: int) -> bytes:
+    data = stream.read(size)
+    if data is None or len(data) != size:
+        raise EOFError(f"Expected {size} bytes, got {0 if data is None else len(data)}")
+    return data
+
+
+def read_message(stream):
+    """
+    Read one message from a binary stream.
+
+    Returns:
+        tuple: (message, payload) where payload is the raw frame bytes or None
+        when the message carries no binary frame. Returns (None, None) on EOF.
+    """
+    line = stream.readline()
+    if not line:
+        return None, None
+
+    message = json.loads(line)
+    if "payload_bytes" not in message:
+        return message, None
+
+    (size,) = _LENGTH_PREFIX.unpack(_read_exact(stream, _LENGTH_PREFIX.size))
+    return message, _read_exact(stream, size)
+
+
+def decode_audio(message: dict, payload=None) -> np.ndarray:
+    """Decode the audio carried by a response into a numpy array."""
+    encoding = message.get("encoding", ENCODING_WAV_BASE64)
+    if encoding == ENCODING_WAV_BASE64:
+        wav_bytes = base64.b64decode(message["audio"])
+        with wave.open(io.BytesIO(wav_bytes), 'rb') as wav_file:
+            return np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype="<i2")
+    return np.frombuffer(payload, dtype=_PCM_DTYPES[encoding])
@@ -0,0 +1,50 @@
+"""
+Per-machine profile of what warmup actually buys.
+
+With "warmup_buckets" in init, warmup (see Qwen3TTS.warmup) synthesizes one
+text per length bucket twice: the first (cold) run pays allocator growth and
+kernel selection for that shape, the second (warm) run is the steady state.
+The latency curve of both runs is stored in a JSON file keyed by a machine signature (as in
+thread_profile.py, plus the bucket set), together with the buckets whose cold
+run was noticeably slower than their warm run. Later launches with the same
+signature only warm those buckets, once each, or skip warmup entirely when
+no bucket needed it. Delete the file (or pass "force" to warmup) to profile
+again.
+"""
+
+import os
+from pathlib import Path
+
+from thread_profile import load_profile, save_profile
+
+# A bucket needs warming when its cold run is this much slower than its warm run
+WARMUP_GAIN = 1.2
+
+
+def default_profile_path() -> Path:
+    """Profile file location, overridable with KOKORO_TTS_WARMUP_PROFILE."""
+    override = os.environ.get("KOKORO_TTS_WARMUP_PROFILE")
+    if override:
+        return Path(override)
+    return Path.home() / ".cache" / "kokoro-reader" / "warmup_profile.json"
+
+
+def warmup_signature(machine: str, buckets) -> str:
+    return f"{machine}|buckets={','.join(str(chars) for chars in buckets)}"
+
+
+def needed_buckets(curve: list) -> list:
+    """Buckets whose first run was slower than steady state by more than WARMUP_GAIN."""
+    return [point["chars"] for point in curve if point["cold_ms"] > point["warm_ms"] * WARMUP_GAIN]
+
+
+def load_warmup_profile(signature: str, path: Path = None) -> dict:
+    """The stored curve for this signature, or None."""
+    return load_profile(signature, path or default_profile_path())
+
+
+def save_warmup_profile(signature: str, curve: list, path: Path = None) -> dict:
+    """Store a measured curve (and the buckets it says need warming)."""
+    entry = {"curve": curve, "needed": needed_buckets(curve)}
+    save_profile(signature, entry, path or default_profile_path())
+    return entry
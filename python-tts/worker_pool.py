@@ -0,0 +1,252 @@
+"""
+Multi-process CPU worker pool for the TTS sidecar.
+
+One Qwen3TTS instance only keeps a few cores busy on a many-core CPU, so in
+pool mode ({"action": "init", "workers": N}) the sidecar process keeps the
+stdin/stdout protocol and hands generation to N worker processes. Each worker
+loads its own model and is limited to its own slice of the cores
+(threads_per_worker intra-op threads and, where the OS supports it, a CPU
+affinity mask over the same number of cores), so the workers do not fight
+over the same cores.
+
+The pool is used synchronously from the sidecar's single worker thread: a
+micro-batch is scattered across the processes round-robin and gathered back
+in its original order, so responses keep request order.
+
+Workers are started with the "spawn" method (forking a process that may
+already hold torch state is unsafe) and talk to the sidecar over pipes:
+
+    ("init", kwargs)                               -> ("ok", info)
+    ("batch", texts, speeds, temp, speakers)       -> ("ok", [(audio, sample_rate), ...])
+    ("stream", text, speed, temp, speaker, pieces) -> ("chunk", audio, sample_rate, final) ...
+    ("warmup", force)                              -> ("ok", report)
+    None                                           -> worker exits
+
+Any request may instead be answered with ("error", message) or
+("cancelled",).
+"""
+
+import multiprocessing
+import os
+import sys
+
+from tts_protocol import NO_TIMINGS
+
+# Environment variables read by the BLAS/OpenMP runtimes when torch loads
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def default_threads_per_worker(workers: int) -> int:
+    """Split the machine's cores evenly between the workers."""
+    return max((os.cpu_count() or 1) // workers, 1)
+
+
+def _pin(index: int, threads: int):
+    """Restrict this process to `threads` cores of its own (Linux only)."""
+    if not hasattr(os, "sched_setaffinity"):
+        return
+    available = sorted(os.sched_getaffinity(0))
+    if len(available) < threads * (index + 1):
+        return
+    os.sched_setaffinity(0, available[threads * index:threads * (index + 1)])
+
+
+def _worker_main(conn, index: int, threads: int, cancel_event):
+    """Entry point of a worker process."""
+    # Library output must never reach the protocol stream the sidecar owns
+    os.dup2(sys.stderr.fileno(), 1)
+    for name in _THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    _pin(index, threads)
+
+    import qwen3_tts_cuda
+
+    tts = qwen3_tts_cuda.Qwen3TTS()
+    tts.cancel_event = cancel_event
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+
+        kind, args = request[0], request[1:]
+        try:
+            if kind == "init":
+                device = tts.init_model(**args[0])
+                if qwen3_tts_cuda.torch is not None:
+                    qwen3_tts_cuda.torch.set_num_threads(threads)
+                conn.send(("ok", {
+                    "device": device,
+                    "model_id": tts.model_id,
+                    "precision": tts.precision,
+                    "speaker": tts.speaker,
+                    "speakers": tts.describe_speakers(),
+                    "compile": tts.compiled,
+                    "warmup": tts.warmup_report,
+                    "sample_rate": tts.sample_rate,
+                    "models": tts.registry.describe(),
+                }))
+            elif kind == "batch":
+                texts, speeds, temperature, speakers = args
+                conn.send(("ok", tts.synthesize_batch(texts, speeds, temperature, speakers=speakers)))
+            elif kind == "stream":
+                for audio, sample_rate, final in tts.synthesize_stream(*args):
+                    conn.send(("chunk", audio, sample_rate, final))
+            elif kind == "warmup":
+                conn.send(("ok", tts.warmup(*args)))
+            else:
+                conn.send(("error", f"Unknown worker request: {kind}"))
+        except qwen3_tts_cuda.GenerationCancelled:
+            conn.send(("cancelled",))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+class WorkerPool:
+    """
+    N model processes driven from one thread.
+
+    Args:
+        workers: Number of worker processes
+        threads_per_worker: Intra-op threads (and pinned cores) per worker;
+            defaults to an even split of the machine's cores
+        cancelled_error: Exception raised when a worker reports that its
+            generation was cancelled (the sidecar's GenerationCancelled)
+    """
+
+    def __init__(self, workers: int, threads_per_worker: int = None, cancelled_error=RuntimeError):
+        self.size = workers
+        self.cancelled_error = cancelled_error
+        self.threads_per_worker = threads_per_worker or default_threads_per_worker(workers)
+
+        context = multiprocessing.get_context("spawn")
+        # Shared with every worker; set to abort the running generation
+        self.cancel_event = context.Event()
+        self._connections = []
+        self._processes = []
+        for index in range(workers):
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_worker_main,
+                args=(child, index, self.threads_per_worker, self.cancel_event),
+                name=f"tts-pool-{index}",
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+    def _receive(self, index: int):
+        try:
+            return self._connections[index].recv()
+        except EOFError:
+            raise RuntimeError(f"TTS worker {index} exited")
+
+    def _raise_for(self, reply):
+        if reply[0] == "cancelled":
+            raise self.cancelled_error()
+        raise RuntimeError(reply[1] if reply[0] == "error" else f"Unexpected worker reply: {reply[0]}")
+
+    def _gather(self, indices) -> list:
+        """
+        Collect one reply from each worker in `indices`.
+
+        Every reply is read before raising, so a failure in one worker never
+        leaves another's answer in its pipe.
+        """
+        replies = [self._receive(index) for index in indices]
+        failed = [reply for reply in replies if reply[0] != "ok"]
+        if failed:
+            # A cancellation takes precedence over errors it may have caused
+            self._raise_for(next((reply for reply in failed if reply[0] == "cancelled"), failed[0]))
+        return [reply[1] for reply in replies]
+
+    def init_model(self, **kwargs) -> dict:
+        """Load the model in every worker in parallel; returns worker 0's info."""
+        for connection in self._connections:
+            connection.send(("init", kwargs))
+        return self._gather(range(self.size))[0]
+
+    def warmup(self, force: bool = False) -> dict:
+        """Warm every worker in parallel; returns worker 0's warmup report."""
+        for connection in self._connections:
+            connection.send(("warmup", force))
+        return self._gather(range(self.size))[0]
+
+    def synthesize_batch(self, texts: list, speeds: list, temperature: float = 0.1, timings=NO_TIMINGS,
+                         speakers: list = None) -> list:
+        """
+        Split a batch round-robin over the workers and return results in input order.
+
+        Only the whole scatter/gather is timed (as "generate"); the stages
+        inside the workers are not reported.
+        """
+        timings.start()
+        used = range(min(self.size, len(texts)))
+        speakers = speakers or [None] * len(texts)
+        for index in used:
+            self._connections[index].send(
+                ("batch", texts[index::self.size], speeds[index::self.size], temperature, speakers[index::self.size])
+            )
+
+        results = [None] * len(texts)
+        for index, part in zip(used, self._gather(used)):
+            results[index::self.size] = part
+        timings.mark("generate")
+        return results
+
+    def synthesize_stream(
+        self, text: str, speed: float = 1.0, temperature: float = 0.1, speaker: str = None, pieces: list = None
+    ):
+        """
+        Stream one text from the first worker; yields (audio, sample_rate, final).
+
+        If the consumer stops early (an exception while handling a chunk, or
+        the generator being closed), the rest of the stream is cancelled and
+        drained, so no stale chunk is left in the pipe for the next request.
+        """
+        self._connections[0].send(("stream", text, speed, temperature, speaker, pieces))
+        finished = False
+        try:
+            while not finished:
+                reply = self._receive(0)
+                if reply[0] != "chunk":
+                    finished = True
+                    self._raise_for(reply)
+                _, audio, sample_rate, finished = reply
+                yield audio, sample_rate, finished
+        finally:
+            if not finished:
+                self._drain_stream()
+
+    def _drain_stream(self):
+        """Stop worker 0's running stream and discard its replies up to the last one."""
+        self.cancel_event.set()
+        try:
+            while True:
+                reply = self._receive(0)
+                if reply[0] != "chunk" or reply[3]:
+                    return
+        except RuntimeError:
+            # The worker exited; there is nothing left to drain
+            pass
+        finally:
+            self.cancel_event.clear()
+
+    def close(self):
+        """Stop the workers, waiting briefly for each to exit."""
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for connection in self._connections:
+            connection.close()